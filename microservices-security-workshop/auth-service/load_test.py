@@ -0,0 +1,114 @@
+# Login storm load test: /users/me latency while logins hash passwords
+#
+#   python load_test.py --logins 32 --duration 10
+#   python load_test.py --logins 32 --duration 10 --blocking
+#
+# Serves main.app with uvicorn in a background thread (rate limits off),
+# probes GET /users/me every --interval ms, first idle and then while
+# --logins clients log in back to back. --blocking puts back the old
+# behaviour of verifying the password on the event loop, for comparison.
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET_KEY", "load-test-secret")
+
+import httpx
+import uvicorn
+
+import main
+from shared import auth
+
+def start_server():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+async def probe(client, token, interval, stop):
+    timings = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(interval)
+    return timings
+
+async def login_loop(client, stop, outcomes):
+    while not stop.is_set():
+        response = await client.post("/token", data={"username": "user", "password": "user123"})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+def summary(timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return (f"{len(timings):6} probes  median {statistics.median(timings) * 1000:7.1f}ms  "
+            f"p99 {p99 * 1000:7.1f}ms  max {timings[-1] * 1000:7.1f}ms")
+
+async def run(base_url, args):
+    limits = httpx.Limits(max_connections=args.logins + 4)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        response = await client.post("/token", data={"username": "user", "password": "user123"})
+        token = response.json()["access_token"]
+
+        stop = asyncio.Event()
+        idle = asyncio.create_task(probe(client, token, args.interval / 1000, stop))
+        await asyncio.sleep(args.duration / 2)
+        stop.set()
+        idle = await idle
+
+        stop = asyncio.Event()
+        outcomes = {}
+        started = time.perf_counter()
+        storm = asyncio.create_task(probe(client, token, args.interval / 1000, stop))
+        logins = [asyncio.create_task(login_loop(client, stop, outcomes)) for _ in range(args.logins)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        storm = await storm
+        await asyncio.gather(*logins)
+        elapsed = time.perf_counter() - started
+
+    mode = "blocking verify_password" if args.blocking else (
+        f"{auth.PASSWORD_HASH_EXECUTOR} pool, {auth.PASSWORD_HASH_WORKERS} workers, "
+        f"queue {auth.PASSWORD_HASH_QUEUE_LIMIT}")
+    print(f"{mode}, {args.logins} concurrent login clients")
+    print(f"/users/me idle:        {summary(idle)}")
+    print(f"/users/me login storm: {summary(storm)}")
+    answered = ", ".join(f"{count} x {code}" for code, count in sorted(outcomes.items()))
+    print(f"logins: {answered} ({outcomes.get(200, 0) / elapsed:.1f} successful/s)")
+
+def cli():
+    parser = argparse.ArgumentParser(description="Login storm against the auth service")
+    parser.add_argument("--logins", type=int, default=32, help="Concurrent login clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of login storm")
+    parser.add_argument("--interval", type=float, default=20, help="Milliseconds between /users/me probes")
+    parser.add_argument("--blocking", action="store_true", help="Verify passwords on the event loop")
+    args = parser.parse_args()
+
+    main.limiter.enabled = False
+    if args.blocking:
+        async def verify_on_loop(username, plain_password):
+            return auth.verify_password(plain_password, auth.USER_PASSWORDS[username])
+        main.verify_user_password_async = verify_on_loop
+
+    server, base_url = start_server()
+    try:
+        asyncio.run(run(base_url, args))
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    cli()
@@ -9,7 +9,7 @@ import jwt as PyJWT
 from shared.auth import (
     create_access_token, create_refresh_token, verify_token,
     SECRET_KEY, ALGORITHM, USERS, USER_PASSWORDS,
-    verify_password, get_current_user, User, UserCreate, get_password_hash
+    verify_user_password_async, get_current_user, User, UserCreate, get_password_hash_async
 )
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -68,8 +68,8 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verify password
-    if not verify_password(form_data.password, USER_PASSWORDS[form_data.username]):
+    # Verify password (off the event loop)
+    if not await verify_user_password_async(form_data.username, form_data.password):
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
@@ -165,6 +165,14 @@ async def register(request: Request, user_data: UserCreate):
             detail="Username already registered"
         )
     
+    # Hash off the event loop, then re-check: another registration may have won meanwhile
+    hashed_password = await get_password_hash_async(user_data.password)
+    if user_data.username in USERS:
+        raise HTTPException(
+            status_code=400,
+            detail="Username already registered"
+        )
+    
     # Create new user
     new_user = User(
         username=user_data.username,
@@ -175,7 +183,7 @@ async def register(request: Request, user_data: UserCreate):
     
     # Store user and hashed password
     USERS[user_data.username] = new_user
-    USER_PASSWORDS[user_data.username] = get_password_hash(user_data.password)
+    USER_PASSWORDS[user_data.username] = hashed_password
     
     # Create tokens for immediate login
     access_token = create_access_token(data={
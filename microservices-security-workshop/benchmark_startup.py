@@ -0,0 +1,63 @@
+# Startup cost of importing shared.auth, as every service does
+#
+#   python benchmark_startup.py --runs 5
+#
+# Imports shared.auth in fresh processes and reports the median import
+# time and peak memory for: the previous eager behaviour (both demo
+# hashes computed at import), lazy demo hashes (the default), and
+# precomputed hashes from DEMO_PASSWORD_HASHES.
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = """
+import time, resource
+start = time.perf_counter()
+import shared.auth as auth
+if {eager}:
+    for username in auth.DEMO_PASSWORDS:
+        auth.USER_PASSWORDS[username]
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def import_once(env, eager=False):
+    output = subprocess.run([sys.executable, "-c", CHILD.format(eager=eager)], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    elapsed, max_rss_kb = output.split()
+    return float(elapsed), int(max_rss_kb)
+
+def measure(name, runs, env, eager=False):
+    results = [import_once(env, eager) for _ in range(runs)]
+    elapsed = statistics.median(result[0] for result in results)
+    max_rss = statistics.median(result[1] for result in results) / 1024
+    print(f"{name:34} {elapsed * 1000:9.1f}ms {max_rss:9.1f}MB")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared.auth import time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode")
+    args = parser.parse_args()
+
+    env = dict(os.environ, JWT_SECRET_KEY=os.getenv("JWT_SECRET_KEY", "benchmark-secret"))
+    env.pop("DEMO_PASSWORD_HASHES", None)
+    env.pop("DEMO_PASSWORD_HASHES_FILE", None)
+    hashes = subprocess.run([sys.executable, "-m", "shared.auth"], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout.strip()
+    json.loads(hashes)
+
+    print(f"median of {args.runs} imports")
+    print(f"{'mode':34} {'import':>11} {'peak RSS':>11}")
+    eager = measure("eager demo hashes (previous)", args.runs, env, eager=True)
+    lazy = measure("lazy demo hashes (default)", args.runs, env)
+    precomputed = measure("DEMO_PASSWORD_HASHES", args.runs, dict(env, DEMO_PASSWORD_HASHES=hashes))
+    print(f"\nimport time saved per process: lazy {(eager - lazy) * 1000:.0f}ms, "
+          f"precomputed {(eager - precomputed) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    sys.exit(main())
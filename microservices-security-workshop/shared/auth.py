@@ -3,11 +3,15 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2Pas
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import jwt as PyJWT
 from datetime import datetime, timedelta
 import os
 from passlib.context import CryptContext
 import time
+import json
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -30,6 +34,14 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+# Password hashing pool for async handlers: each Argon2id job holds 64MB for
+# hundreds of ms, so only PASSWORD_HASH_WORKERS run at once and at most
+# PASSWORD_HASH_QUEUE_LIMIT more may wait; beyond that callers get a 503.
+# "thread" workers suffice (argon2-cffi releases the GIL), "process" isolates them.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "8"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
     email: EmailStr
@@ -60,12 +72,35 @@ USERS = {
     )
 }
 
-# Store hashed passwords - in production, use a database
-USER_PASSWORDS = {
-    "admin": pwd_context.hash("admin123"),  # Change in production!
-    "user": pwd_context.hash("user123")     # Change in production!
+# Demo passwords - in production, use a database
+DEMO_PASSWORDS = {
+    "admin": "admin123",  # Change in production!
+    "user": "user123"     # Change in production!
 }
 
+class _PasswordHashes(dict):
+    """Stored password hashes; a demo user's is computed on first lookup unless preloaded"""
+
+    def __missing__(self, username: str) -> str:
+        if username not in DEMO_PASSWORDS:
+            raise KeyError(username)
+        return self.setdefault(username, pwd_context.hash(DEMO_PASSWORDS[username]))
+
+def _load_demo_password_hashes() -> dict:
+    """Precomputed demo hashes from DEMO_PASSWORD_HASHES_FILE or DEMO_PASSWORD_HASHES (JSON)"""
+    path = os.getenv("DEMO_PASSWORD_HASHES_FILE")
+    if path:
+        with open(path) as f:
+            hashes = json.load(f)
+    else:
+        hashes = json.loads(os.getenv("DEMO_PASSWORD_HASHES", "{}"))
+    return {username: hashed for username, hashed in hashes.items() if username in DEMO_PASSWORDS}
+
+# Store hashed passwords - in production, use a database. Hashing the demo
+# users here would cost every importing service (and worker) an Argon2id run
+# per user at startup, so their hashes are preloaded from config or made lazily.
+USER_PASSWORDS = _PasswordHashes(_load_demo_password_hashes())
+
 security = HTTPBearer(
     scheme_name="JWT",
     auto_error=True,
@@ -80,6 +115,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+_hash_executor = None
+_hash_jobs = 0
+_hash_jobs_lock = threading.Lock()
+
+def _get_hash_executor():
+    global _hash_executor
+    if _hash_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                                thread_name_prefix="password-hash")
+    return _hash_executor
+
+def _release_hash_job(_future) -> None:
+    global _hash_jobs
+    with _hash_jobs_lock:
+        _hash_jobs -= 1
+
+async def _run_hash_job(func, *args):
+    global _hash_jobs
+    with _hash_jobs_lock:
+        if _hash_jobs >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password checks in progress, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _hash_jobs += 1
+    try:
+        future = _get_hash_executor().submit(func, *args)
+    except BaseException:
+        _release_hash_job(None)
+        raise
+    # Released when the job finishes, even if the awaiting request is cancelled
+    future.add_done_callback(_release_hash_job)
+    return await asyncio.wrap_future(future)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool; raises a 503 HTTPException when it is full"""
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool; raises a 503 HTTPException when it is full"""
+    return await _run_hash_job(get_password_hash, password)
+
+def _stored_password_hash(username: str) -> str:
+    return USER_PASSWORDS[username]
+
+async def verify_user_password_async(username: str, plain_password: str) -> bool:
+    """verify_password_async against username's stored hash, making a demo user's hash on the pool"""
+    hashed_password = USER_PASSWORDS.get(username)
+    if hashed_password is None:
+        hashed_password = USER_PASSWORDS.setdefault(
+            username, await _run_hash_job(_stored_password_hash, username)
+        )
+    return await verify_password_async(plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -186,4 +279,8 @@ def require_admin(user: User = Depends(get_current_user)) -> User:
             status_code=403,
             detail="Admin privileges required"
         )
-    return user 
\ No newline at end of file
+    return user 
+
+if __name__ == "__main__":
+    # Print precomputed demo hashes, e.g. for DEMO_PASSWORD_HASHES
+    print(json.dumps({username: get_password_hash(password) for username, password in DEMO_PASSWORDS.items()}))
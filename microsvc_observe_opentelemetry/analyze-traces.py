@@ -2,32 +2,130 @@
 import requests
 import json
 import time
+import heapq
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+
+from trace_files import iter_traces, span_has_error, trace_services, trace_start
+from latency_sketch import LatencySketches, QUANTILES
+from trace_graph import CriticalPathStats
+from trace_checkpoint import Checkpoint
+from trace_exporter import MetricsExporter, REFRESH_INTERVAL, serve as serve_exporter
+
+try:
+    from span_store import SpanStore  # needs numpy (--columnar)
+except ImportError:
+    SpanStore = None
 
 JAEGER_URL = "http://localhost:16686"
+SERVICES = ['api-gateway', 'user-service', 'order-service', 'inventory-service']
+LOOKBACK = '1h'
+FETCH_WORKERS = 8
+REQUEST_TIMEOUT = 30
+# Per-service limit of each --incremental query
+INCREMENTAL_LIMIT = 1000
+# Exported trace files to analyze instead of querying Jaeger (--input)
+TRACE_FILES = []
+
+# One pooled session for all Jaeger queries, so connections are kept alive
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS)
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
+# Responses for this run, keyed by (service, lookback, limit)
+trace_cache = {}
+trace_cache_lock = threading.Lock()
+
+def _covers(cached_limit, limit):
+    """Whether a response fetched with cached_limit answers limit (None: no limit)"""
+    return cached_limit is None or (limit is not None and cached_limit >= limit)
+
+def cached_traces(service_name, lookback, limit):
+    """Return a cached response that can answer this query, or None.
+
+    A response fetched with a larger limit also answers smaller ones
+    (its first `limit` traces), and a complete unfiltered response
+    answers per-service queries.
+    """
+    with trace_cache_lock:
+        for (service, cached_lookback, cached_limit), traces in trace_cache.items():
+            if cached_lookback != lookback or not _covers(cached_limit, limit):
+                continue
+            data = traces.get('data') or []
+            if service == service_name:
+                return dict(traces, data=data[:limit])
+            if service is None and cached_limit is None:
+                matching = (trace for trace in data if service_name in trace_services(trace))
+                return dict(traces, data=list(islice(matching, limit)))
+    return None
+
+def fetch_traces(service_name=None, limit=20, lookback=LOOKBACK, start=None, end=None):
+    """Query the Jaeger API, or read TRACE_FILES in offline mode (no caching)"""
+    if TRACE_FILES:
+        # Historical exports: lookback does not apply
+        return {'data': list(islice(iter_traces(TRACE_FILES, service_name), limit))}
 
-def get_traces(service_name=None, limit=20):
-    """Fetch traces from Jaeger API"""
     params = {
         'limit': limit,
-        'lookback': '1h'
+        'lookback': lookback
     }
     if service_name:
         params['service'] = service_name
+    if start is not None:
+        # Explicit time range in microseconds; Jaeger then ignores lookback
+        params['start'] = start
+        params['end'] = end
     
-    response = requests.get(f"{JAEGER_URL}/api/traces", params=params)
+    response = session.get(f"{JAEGER_URL}/api/traces", params=params, timeout=REQUEST_TIMEOUT)
     if response.status_code == 200:
         return response.json()
     return None
 
-def analyze_trace_performance():
+def get_traces(service_name=None, limit=20, lookback=LOOKBACK):
+    """Fetch traces from Jaeger API, reusing responses already fetched in this run"""
+    traces = cached_traces(service_name, lookback, limit)
+    if traces is None:
+        traces = fetch_traces(service_name, limit, lookback)
+        if traces is not None:
+            with trace_cache_lock:
+                trace_cache[(service_name, lookback, limit)] = traces
+    return traces
+
+def prefetch_traces(queries, lookback=LOOKBACK):
+    """Run (service, limit) queries concurrently and cache their responses"""
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        list(executor.map(lambda query: get_traces(query[0], query[1], lookback), queries))
+
+def load_span_store(limit=None):
+    """Flatten TRACE_FILES (all traces) or one Jaeger query into a SpanStore"""
+    if TRACE_FILES:
+        return SpanStore.from_traces(iter_traces(TRACE_FILES))
+    traces = get_traces(limit=limit)
+    return SpanStore.from_traces((traces or {}).get('data') or [])
+
+def print_service_durations(service, average, maximum, minimum, count):
+    print(f"\n📊 {service}:")
+    print(f"  Average duration: {average:.2f}ms")
+    print(f"  Max duration: {maximum:.2f}ms")
+    print(f"  Min duration: {minimum:.2f}ms")
+    print(f"  Total traces: {count}")
+
+def analyze_trace_performance(limit=20, store=None):
     """Analyze trace performance metrics"""
     print("🔍 Analyzing trace performance...")
     
-    services = ['api-gateway', 'user-service', 'order-service', 'inventory-service']
-    
-    for service in services:
-        traces = get_traces(service)
+    for service in SERVICES:
+        if store is not None:
+            durations = store.duration[store.roots()[store.traces_with_service(service, limit)]] / 1000
+            if len(durations):
+                print_service_durations(service, durations.mean(), durations.max(), durations.min(), len(durations))
+            continue
+        traces = get_traces(service, limit)
         if traces and 'data' in traces:
             trace_data = traces['data']
             if trace_data:
@@ -39,24 +137,28 @@ def analyze_trace_performance():
                         durations.append(duration)
                 
                 if durations:
-                    avg_duration = sum(durations) / len(durations)
-                    max_duration = max(durations)
-                    min_duration = min(durations)
-                    
-                    print(f"\n📊 {service}:")
-                    print(f"  Average duration: {avg_duration:.2f}ms")
-                    print(f"  Max duration: {max_duration:.2f}ms")
-                    print(f"  Min duration: {min_duration:.2f}ms")
-                    print(f"  Total traces: {len(durations)}")
+                    print_service_durations(service, sum(durations) / len(durations), max(durations),
+                                            min(durations), len(durations))
 
-def find_slow_traces(threshold_ms=1000):
+def find_slow_traces(threshold_ms=1000, limit=50, store=None):
     """Find traces slower than threshold"""
     print(f"\n🐌 Finding traces slower than {threshold_ms}ms...")
     
-    traces = get_traces(limit=50)
+    traces = get_traces(limit=limit) if store is None else None
     slow_traces = []
     
-    if traces and 'data' in traces:
+    if store is not None:
+        roots = store.slow_roots(threshold_ms * 1000, limit)
+        for root in roots[:5]:
+            slow_traces.append({
+                'trace_id': store.trace_ids[store.trace[root]],
+                'duration': store.duration[root] / 1000,
+                'operation': store.operations[store.operation[root]],
+                'service': store.services[store.service[root]]
+            })
+        # Only the top 5 are materialized; keep the count of all slow traces
+        slow_count = len(roots)
+    elif traces and 'data' in traces:
         for trace in traces['data']:
             if 'spans' in trace:
                 root_span = min(trace['spans'], key=lambda x: x['startTime'])
@@ -70,8 +172,13 @@ def find_slow_traces(threshold_ms=1000):
                         'service': root_span.get('process', {}).get('serviceName', 'unknown')
                     })
     
+    if store is None:
+        slow_count = len(slow_traces)
+    print_slow_traces(slow_traces, slow_count)
+
+def print_slow_traces(slow_traces, slow_count):
     if slow_traces:
-        print(f"Found {len(slow_traces)} slow traces:")
+        print(f"Found {slow_count} slow traces:")
         for trace in sorted(slow_traces, key=lambda x: x['duration'], reverse=True)[:5]:
             print(f"  🔗 Trace ID: {trace['trace_id'][:16]}...")
             print(f"     Duration: {trace['duration']:.2f}ms")
@@ -82,14 +189,23 @@ def find_slow_traces(threshold_ms=1000):
     else:
         print("No slow traces found!")
 
-def analyze_error_traces():
+def analyze_error_traces(limit=100, store=None):
     """Find traces with errors"""
     print("\n❌ Analyzing error traces...")
     
-    traces = get_traces(limit=100)
+    traces = get_traces(limit=limit) if store is None else None
     error_traces = []
     
-    if traces and 'data' in traces:
+    if store is not None:
+        rows = store.first_error_spans(limit)
+        error_count = len(rows)
+        for row in rows[:5]:
+            error_traces.append({
+                'trace_id': store.trace_ids[store.trace[row]],
+                'operation': store.operations[store.operation[row]],
+                'service': store.services[store.service[row]]
+            })
+    elif traces and 'data' in traces:
         for trace in traces['data']:
             if 'spans' in trace:
                 for span in trace['spans']:
@@ -104,29 +220,317 @@ def analyze_error_traces():
                         })
                         break
     
+    if store is None:
+        error_count = len(error_traces)
+    print_error_traces(error_traces, error_count)
+
+def print_error_traces(error_traces, error_count):
     if error_traces:
-        print(f"Found {len(error_traces)} traces with errors:")
+        print(f"Found {error_count} traces with errors:")
         for trace in error_traces[:5]:
             print(f"  🔗 {trace['trace_id'][:16]}... - {trace['service']} - {trace['operation']}")
     else:
         print("No error traces found!")
 
-if __name__ == "__main__":
+def stream_traces(limit=100):
+    """The first limit traces: from this run's cache, streamed from TRACE_FILES, or fetched"""
+    traces = cached_traces(None, LOOKBACK, limit)
+    if traces is None and TRACE_FILES and limit is None:
+        # Stream the files rather than holding every trace
+        return iter_traces(TRACE_FILES)
+    if traces is None:
+        traces = get_traces(limit=limit)
+    return (traces or {}).get('data') or []
+
+def collect_latency_sketches(limit=100, store=None):
+    """Sketch span durations per service and per operation, in constant memory"""
+    sketches = LatencySketches()
+    if store is not None:
+        sketches.record_store(store, limit)
+        return sketches
+    for trace in stream_traces(limit):
+        sketches.record_trace(trace)
+    return sketches
+
+def print_latency_percentiles(sketches):
+    """Print p50/p90/p99/p999 per service and operation"""
+    print("\n⏱️  Latency percentiles (ms)...")
+    header = '  '.join(f"{'p' + format(q * 100, 'g').replace('.', ''):>9}" for q in QUANTILES)
+    for service in sketches.services():
+        print(f"\n📊 {service} ({sketches.sketch(service).count} spans):")
+        print(f"  {'operation':40}{header}")
+        for operation in [None] + sketches.operations(service):
+            sketch = sketches.sketch(service, operation)
+            values = '  '.join(f"{sketch.quantile(q) / 1000:9.2f}" for q in QUANTILES)
+            print(f"  {(operation or '(all)')[:39]:40}{values}")
+
+def analyze_critical_paths(limit=100, stats=None):
+    """Find which downstream spans the slowest requests actually waited on"""
+    print("\n🧭 Analyzing critical paths...")
+
+    if stats is None:
+        stats = CriticalPathStats()
+        for trace in stream_traces(limit):
+            stats.add_trace(trace)
+    if not stats.traces:
+        print("No traces found!")
+        return stats
+
+    roots = sorted(stats.traces, key=lambda root: sum(stats.path_time[root].values()), reverse=True)
+    for service, operation in roots[:5]:
+        print(f"\n📊 {service} - {operation} ({stats.traces[(service, operation)]} traces):")
+        for (span_service, span_operation), share, average in stats.top_contributors((service, operation)):
+            self_ms = stats.self_time[(span_service, span_operation)] / stats.spans[(span_service, span_operation)] / 1000
+            print(f"  {share:6.1%}  {average / 1000:9.2f}ms/trace  {span_service} - {span_operation} "
+                  f"(self time {self_ms:.2f}ms/span)")
+    return stats
+
+def analyze_trace_stream(traces, threshold_ms=1000, percentiles=False, critical_paths=False):
+    """Run every analysis in one pass over a trace stream, keeping only aggregates
+
+    Prints the same reports as the per-analysis functions; returns the
+    latency sketches when percentiles is set.
+    """
+    durations = {service: [0, 0.0, 0.0, float('inf')] for service in SERVICES}  # count, total, max, min
+    slowest, slow_count = [], 0
+    error_traces, error_count = [], 0
+    sketches = LatencySketches() if percentiles else None
+    stats = CriticalPathStats() if critical_paths else None
+    for index, trace in enumerate(traces):
+        spans = trace.get('spans')
+        if not spans:
+            continue
+        root_span = min(spans, key=lambda x: x['startTime'])
+        duration = root_span.get('duration', 0) / 1000
+        for service in trace_services(trace):
+            if service in durations:
+                total = durations[service]
+                total[0] += 1
+                total[1] += duration
+                total[2] = max(total[2], duration)
+                total[3] = min(total[3], duration)
+        if duration > threshold_ms:
+            slow_count += 1
+            # Keep only the 5 slowest; on equal durations the earlier trace wins
+            entry = (duration, -index, trace['traceID'], root_span)
+            if len(slowest) < 5:
+                heapq.heappush(slowest, entry)
+            elif entry > slowest[0]:
+                heapq.heapreplace(slowest, entry)
+        error_span = next((span for span in spans if span_has_error(span)), None)
+        if error_span is not None:
+            error_count += 1
+            if len(error_traces) < 5:
+                error_traces.append({
+                    'trace_id': trace['traceID'],
+                    'operation': error_span.get('operationName'),
+                    'service': error_span.get('process', {}).get('serviceName')
+                })
+        if sketches is not None:
+            sketches.record_trace(trace)
+        if stats is not None:
+            stats.add_trace(trace)
+
+    print("🔍 Analyzing trace performance...")
+    for service, (count, total, maximum, minimum) in durations.items():
+        if count:
+            print_service_durations(service, total / count, maximum, minimum, count)
+    print(f"\n🐌 Finding traces slower than {threshold_ms}ms...")
+    print_slow_traces([{
+        'trace_id': trace_id,
+        'duration': duration,
+        'operation': root_span.get('operationName', 'unknown'),
+        'service': root_span.get('process', {}).get('serviceName', 'unknown')
+    } for duration, _, trace_id, root_span in sorted(slowest, reverse=True)], slow_count)
+    print("\n❌ Analyzing error traces...")
+    print_error_traces(error_traces, error_count)
+    if sketches is not None:
+        print_latency_percentiles(sketches)
+    if stats is not None:
+        analyze_critical_paths(stats=stats)
+    return sketches
+
+def parse_duration(text):
+    """Seconds in a Jaeger-style duration such as '90s', '15m' or '1h'"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def fetch_new_traces(since, limit=INCREMENTAL_LIMIT):
+    """Traces starting at or after since (microseconds), from every service"""
+    if TRACE_FILES:
+        return (trace for trace in iter_traces(TRACE_FILES) if trace_start(trace) >= since)
+    end = int(time.time() * 1_000_000)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        responses = list(executor.map(lambda service: fetch_traces(service, limit, start=since, end=end), SERVICES))
+    for service, response in zip(SERVICES, responses):
+        if response and len(response.get('data') or []) >= limit:
+            print(f"⚠️  {service}: {limit} traces returned, some may be missing; run more often "
+                  f"or raise --incremental-limit")
+    # Traces spanning several services come back once per service; the checkpoint skips repeats
+    return (trace for response in responses if response for trace in response.get('data') or [])
+
+def refresh_checkpoint(checkpoint, limit=INCREMENTAL_LIMIT):
+    """Fold traces newer than the checkpoint into its rolling window; returns how many were new"""
+    if TRACE_FILES:
+        # Historical exports: the newest trace seen is "now"
+        since = checkpoint.since(checkpoint.watermark) if checkpoint.watermark is not None else 0
+    else:
+        since = checkpoint.since(int(time.time() * 1_000_000))
+    added = checkpoint.add_traces(fetch_new_traces(since, limit))
+    now = (checkpoint.watermark or 0) if TRACE_FILES else int(time.time() * 1_000_000)
+    checkpoint.expire(now)
+    checkpoint.save()
+    return added
+
+def run_incremental(checkpoint_path, window=LOOKBACK, limit=INCREMENTAL_LIMIT):
+    """Fold traces newer than the checkpoint into its rolling window and report the window"""
+    checkpoint = Checkpoint.load(checkpoint_path, parse_duration(window))
+    added = refresh_checkpoint(checkpoint, limit)
+
+    traces, errors, slow, sketches = checkpoint.totals()
+    print(f"🔁 {added} new traces folded in; {traces} traces in the last {window}")
+    if traces:
+        print(f"  Error traces: {errors} ({errors / traces:.1%})")
+        print(f"  Slow traces (>{checkpoint.slow_threshold // 1000}ms): {slow} ({slow / traces:.1%})")
+        print_latency_percentiles(sketches)
+    return checkpoint
+
+def serve_metrics(port, checkpoint_path=None, window=LOOKBACK, limit=INCREMENTAL_LIMIT,
+                  interval=REFRESH_INTERVAL):
+    """Run as a Prometheus exporter: refresh the window in the background, serve /metrics"""
+    checkpoint = Checkpoint.load(checkpoint_path, parse_duration(window))
+
+    def refresh():
+        refresh_checkpoint(checkpoint, limit)
+        return checkpoint
+
+    exporter = MetricsExporter(refresh, interval)
+    exporter.refresh_once()
+    exporter.start()
+    server = serve_exporter(exporter, port=port)
+    print(f"📈 Serving trace metrics on http://0.0.0.0:{port}/metrics (refresh every {interval}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        exporter.stop()
+
+def run_analysis(performance_limit=20, slow_limit=50, error_limit=100, columnar=False, percentiles=False,
+                 critical_paths=False):
+    """Fetch once and run the three analyses; returns the latency sketches when percentiles is set"""
+    limits = [limit for limit in (performance_limit, slow_limit, error_limit) if limit is not None]
+    trace_limit = max(limits) if limits else None
+    sketches = None
+    if columnar:
+        store = load_span_store(trace_limit)
+        analyze_trace_performance(performance_limit, store)
+        find_slow_traces(limit=slow_limit, store=store)
+        analyze_error_traces(error_limit, store)
+        if percentiles:
+            sketches = collect_latency_sketches(trace_limit, store)
+            print_latency_percentiles(sketches)
+        if critical_paths:
+            analyze_critical_paths(trace_limit)
+        return sketches
+    if TRACE_FILES and performance_limit is None and slow_limit is None and error_limit is None:
+        # Every trace of the files: one streaming pass instead of holding them all
+        return analyze_trace_stream(iter_traces(TRACE_FILES), percentiles=percentiles,
+                                    critical_paths=critical_paths)
+    # One concurrent download shared by the three analyses below
+    prefetch_traces([(service, performance_limit) for service in SERVICES]
+                    + [(None, max(slow_limit, error_limit))])
+    analyze_trace_performance(performance_limit)
+    find_slow_traces(limit=slow_limit)
+    analyze_error_traces(error_limit)
+    if percentiles:
+        sketches = collect_latency_sketches(trace_limit)
+        print_latency_percentiles(sketches)
+    if critical_paths:
+        analyze_critical_paths(trace_limit)
+    return sketches
+
+def main():
+    global JAEGER_URL
+    parser = argparse.ArgumentParser(description='Microservices trace analysis')
+    parser.add_argument('--jaeger-url', default=JAEGER_URL, help='Jaeger query API (or jaeger_standin.py)')
+    parser.add_argument('--input', nargs='+', metavar='FILE',
+                        help='Analyze exported trace files (Jaeger JSON, JSON lines, OTLP JSON; .gz ok) '
+                             'instead of querying Jaeger')
+    parser.add_argument('--all', action='store_true', help='With --input: analyze every trace, not just the '
+                                                          'first 20/50/100')
+    parser.add_argument('--columnar', action='store_true', help='Flatten spans into a NumPy column store and '
+                                                               'run vectorized analyses (needs numpy)')
+    parser.add_argument('--percentiles', action='store_true', help='Report p50/p90/p99/p999 span latency per '
+                                                                  'service and operation')
+    parser.add_argument('--save-sketches', metavar='FILE', help='Write the latency sketches to FILE for '
+                                                               'merging later (implies --percentiles)')
+    parser.add_argument('--merge-sketches', nargs='+', metavar='FILE', help='Merge saved sketches (windows, '
+                                                                           'files, shards) and report their '
+                                                                           'percentiles; no traces are read')
+    parser.add_argument('--critical-path', action='store_true', help='Report the biggest critical-path '
+                                                                    'contributors and self time per operation')
+    parser.add_argument('--incremental', metavar='CHECKPOINT', help='Only fetch traces newer than CHECKPOINT, '
+                                                                   'fold them into its rolling window and '
+                                                                   'report the window')
+    parser.add_argument('--window', default=LOOKBACK, help='Rolling window of --incremental (default: %(default)s)')
+    parser.add_argument('--incremental-limit', type=int, default=INCREMENTAL_LIMIT,
+                        help='Per-service trace limit of each incremental query (default: %(default)s)')
+    parser.add_argument('--serve-metrics', type=int, metavar='PORT', help='Run as a Prometheus exporter on PORT; '
+                                                                        'the --window is refreshed incrementally '
+                                                                        '(checkpointed with --incremental)')
+    parser.add_argument('--refresh-interval', type=float, default=REFRESH_INTERVAL,
+                        help='Seconds between exporter refreshes (default: %(default)s)')
+    args = parser.parse_args()
+    if args.columnar and SpanStore is None:
+        parser.error('--columnar needs numpy (pip install numpy)')
+
+    JAEGER_URL = args.jaeger_url
+    if args.input:
+        TRACE_FILES.extend(args.input)
+
     print("🔍 Microservices Trace Analysis")
     print("=" * 40)
+
+    if args.merge_sketches:
+        sketches = LatencySketches.load(args.merge_sketches[0])
+        for path in args.merge_sketches[1:]:
+            sketches.merge(LatencySketches.load(path))
+        print(f"Merged {len(args.merge_sketches)} sketch file(s)")
+        print_latency_percentiles(sketches)
+        if args.save_sketches:
+            sketches.save(args.save_sketches)
+        return
     
     try:
-        analyze_trace_performance()
-        find_slow_traces()
-        analyze_error_traces()
+        if args.serve_metrics:
+            serve_metrics(args.serve_metrics, args.incremental, args.window, args.incremental_limit,
+                          args.refresh_interval)
+            return
+        if args.incremental:
+            run_incremental(args.incremental, args.window, args.incremental_limit)
+            return
+        percentiles = args.percentiles or bool(args.save_sketches)
+        if args.input and args.all:
+            sketches = run_analysis(None, None, None, args.columnar, percentiles, args.critical_path)
+        else:
+            sketches = run_analysis(columnar=args.columnar, percentiles=percentiles,
+                                    critical_paths=args.critical_path)
+        if args.save_sketches:
+            sketches.save(args.save_sketches)
+            print(f"\n💾 Latency sketches saved to {args.save_sketches}")
         
         print("\n✅ Analysis complete!")
-        print(f"\n🌐 View traces in Jaeger UI: {JAEGER_URL}")
+        if not args.input:
+            print(f"\n🌐 View traces in Jaeger UI: {JAEGER_URL}")
         
     except requests.exceptions.ConnectionError:
         print(f"❌ Could not connect to Jaeger at {JAEGER_URL}")
         print("Make sure Jaeger is running and accessible.")
 
+if __name__ == "__main__":
+    main()
+
 
 # chmod +x analyze-traces.py
 
@@ -30,10 +30,16 @@ app.get('/api/user/:userId/orders', async (req, res) => {
     const userResponse = await axios.get(`http://user-service:3001/users/${userId}`);
     const user = userResponse.data;
     
-    // Fetch user's orders
-    const ordersResponse = await axios.get('http://order-service:3002/orders');
-    const allOrders = ordersResponse.data;
-    const userOrders = allOrders.filter(order => order.user_id == userId);
+    // Fetch user's orders, filtered by order-service, one page at a time
+    const userOrders = [];
+    let cursor;
+    do {
+      const ordersResponse = await axios.get('http://order-service:3002/orders', {
+        params: { user_id: userId, limit: 500, cursor }
+      });
+      userOrders.push(...ordersResponse.data);
+      cursor = ordersResponse.headers['x-next-cursor'];
+    } while (cursor);
     
     // Enrich orders with inventory details
     for (let order of userOrders) {
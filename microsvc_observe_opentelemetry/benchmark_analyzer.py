@@ -0,0 +1,72 @@
+# Benchmark analyze-traces.py without a live cluster
+#
+#   python3 benchmark_analyzer.py --traces 100000
+#
+# Generates synthetic traces, then times the analysis reading the file
+# directly (--input), with the NumPy span store (--columnar) and through
+# jaeger_standin.py over HTTP.
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import importlib.util
+
+from trace_files import write_synthetic_traces
+from jaeger_standin import serve
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_analyzer():
+    spec = importlib.util.spec_from_file_location('analyze_traces', os.path.join(HERE, 'analyze-traces.py'))
+    analyzer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(analyzer)
+    return analyzer
+
+def timed(label, analyzer, limits, columnar=False):
+    analyzer.trace_cache.clear()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        analyzer.run_analysis(*limits, columnar=columnar)
+        elapsed = time.perf_counter() - start
+    print(f"{label:28} {elapsed:8.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the trace analyzer offline')
+    parser.add_argument('--traces', type=int, default=100000, help='Number of synthetic traces')
+    parser.add_argument('--http-limit', type=int, default=1000, help='limit used for the HTTP run')
+    args = parser.parse_args()
+
+    analyzer = load_analyzer()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'traces.jsonl')
+        start = time.perf_counter()
+        write_synthetic_traces(path, args.traces, analyzer.SERVICES)
+        print(f"Generated {args.traces} traces in {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        analyzer.TRACE_FILES[:] = [path]
+        timed(f"offline, all {args.traces} traces", analyzer, (None, None, None))
+        if analyzer.SpanStore is not None:
+            timed(f"columnar, all {args.traces} traces", analyzer, (None, None, None), columnar=True)
+            store = analyzer.load_span_store()
+            start = time.perf_counter()
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                analyzer.analyze_trace_performance(None, store)
+                analyzer.find_slow_traces(limit=None, store=store)
+                analyzer.analyze_error_traces(None, store)
+            print(f"{'  queries only':28} {time.perf_counter() - start:8.3f}s "
+                  f"({len(store)} spans, {store.nbytes / 1e6:.1f} MB of columns)")
+
+        server = serve([path], port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        analyzer.TRACE_FILES.clear()
+        analyzer.JAEGER_URL = f"http://127.0.0.1:{server.server_port}"
+        limit = args.http_limit
+        timed(f"stand-in HTTP, limit {limit}", analyzer, (limit, limit, limit))
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
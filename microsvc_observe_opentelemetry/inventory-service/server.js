@@ -72,6 +72,47 @@ app.get('/inventory/:productId', async (req, res) => {
   }
 });
 
+// Availability of many products in one round trip: {"items": [{"product_id", "quantity"}]}
+const MAX_BATCH_ITEMS = 1000;
+
+app.post('/inventory/batch', async (req, res) => {
+  const span = tracer.startSpan('get_inventory_batch');
+  
+  try {
+    const items = req.body && req.body.items;
+    if (!Array.isArray(items)) {
+      return res.status(400).json({ error: 'items must be an array' });
+    }
+    if (items.length > MAX_BATCH_ITEMS) {
+      return res.status(413).json({ error: `At most ${MAX_BATCH_ITEMS} items per batch` });
+    }
+    
+    span.setAttributes({
+      'inventory.batch_size': items.length,
+      'operation.type': 'read'
+    });
+    
+    // Simulate one database lookup for the whole batch
+    await new Promise(resolve => setTimeout(resolve, Math.random() * 40));
+    
+    const results = items.map(({ product_id, quantity = 1 }) => {
+      const item = inventory[parseInt(product_id)];
+      if (!item) {
+        return { product_id, found: false, available: false };
+      }
+      return { product_id, found: true, stock: item.stock, available: item.stock >= quantity };
+    });
+    
+    span.setAttribute('inventory.not_found', results.filter(result => !result.found).length);
+    res.json({ items: results });
+  } catch (error) {
+    span.recordException(error);
+    res.status(500).json({ error: 'Internal server error' });
+  } finally {
+    span.end();
+  }
+});
+
 app.listen(port, () => {
   console.log(`Inventory service listening on port ${port}`);
 });
\ No newline at end of file
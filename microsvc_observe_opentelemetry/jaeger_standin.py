@@ -0,0 +1,81 @@
+# Local stand-in for the Jaeger query API, serving exported trace files
+#
+#   python3 jaeger_standin.py traces.jsonl.gz --port 16686
+#   python3 analyze-traces.py --jaeger-url http://localhost:16686
+#
+# Implements GET /api/services and GET /api/traces (service, limit, start, end
+# in microseconds). Files are streamed on each request, so they are never
+# loaded whole. lookback is ignored: historical traces are always in range.
+import argparse
+import json
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from trace_files import iter_traces, trace_services, trace_start
+
+def find_traces(paths, service=None, limit=20, start=None, end=None):
+    """Return up to limit traces matching the query"""
+    traces = []
+    for trace in iter_traces(paths, service):
+        if start is not None or end is not None:
+            begin = trace_start(trace)
+            if (start is not None and begin < start) or (end is not None and begin > end):
+                continue
+        traces.append(trace)
+        if len(traces) >= limit:
+            break
+    return traces
+
+def make_handler(paths):
+    class JaegerStandinHandler(BaseHTTPRequestHandler):
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if url.path == '/api/services':
+                services = set()
+                for trace in iter_traces(paths):
+                    services |= trace_services(trace)
+                self.send_json({'data': sorted(s for s in services if s)})
+            elif url.path == '/api/traces':
+                try:
+                    limit = int(params.get('limit', 20))
+                    start = int(params['start']) if 'start' in params else None
+                    end = int(params['end']) if 'end' in params else None
+                except ValueError:
+                    self.send_json({'data': None, 'errors': [{'code': 400, 'msg': 'invalid parameter'}]}, 400)
+                    return
+                traces = find_traces(paths, params.get('service'), limit, start, end)
+                self.send_json({'data': traces, 'total': len(traces), 'limit': limit, 'offset': 0, 'errors': None})
+            else:
+                self.send_json({'data': None, 'errors': [{'code': 404, 'msg': 'not found'}]}, 404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return JaegerStandinHandler
+
+def serve(paths, host='127.0.0.1', port=16686):
+    """Create (but do not start) a stand-in server for the given trace files"""
+    return ThreadingHTTPServer((host, port), make_handler(paths))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve exported traces through the Jaeger /api/traces contract')
+    parser.add_argument('files', nargs='+', help='Jaeger JSON, JSON lines or OTLP JSON exports (.gz ok)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=16686)
+    args = parser.parse_args()
+
+    server = serve(args.files, args.host, args.port)
+    print(f"🧪 Jaeger stand-in serving {len(args.files)} file(s) on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
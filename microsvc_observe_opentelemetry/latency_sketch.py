@@ -0,0 +1,200 @@
+# Mergeable latency sketches for per-service / per-operation percentiles
+#
+# A LatencySketch is a log-bucketed histogram (DDSketch-style): every
+# quantile is returned within RELATIVE_ACCURACY of the true value, memory
+# is bounded by the value range (about 1100 buckets for 1us..1h at 1%),
+# and sketches from different windows, files or shards merge by adding
+# bucket counts, so fleet-wide percentiles never need the raw spans.
+#
+#   python3 analyze-traces.py --input a.jsonl --all --save-sketches a.json
+#   python3 analyze-traces.py --input b.jsonl --all --save-sketches b.json
+#   python3 analyze-traces.py --merge-sketches a.json b.json
+import json
+import math
+from collections import defaultdict
+
+try:
+    import numpy as np  # optional: vectorized add_many for column stores
+except ImportError:
+    np = None
+
+RELATIVE_ACCURACY = 0.01
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+class LatencySketch:
+    """Quantile sketch of non-negative durations (microseconds)"""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zero_count += count
+            value = 0
+        else:
+            self.buckets[self._index(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def add_many(self, values):
+        """Add an iterable of values; NumPy arrays are bucketed in one pass"""
+        if np is None or not isinstance(values, np.ndarray):
+            for value in values:
+                self.add(value)
+            return
+        if not len(values):
+            return
+        positive = values[values > 0]
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                    return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] += count
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        self.total += int(positive.sum())
+        low, high = values.min().item(), values.max().item()
+        self.min = max(low, 0) if self.min is None else min(self.min, max(low, 0))
+        self.max = max(high, 0) if self.max is None else max(self.max, high)
+
+    def merge(self, other):
+        """Fold another sketch (same accuracy) into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('cannot merge sketches with different relative accuracy')
+        for index, count in other.buckets.items():
+            self.buckets[index] += count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def count_at_most(self, value):
+        """Approximate number of values <= value (for cumulative histogram buckets)"""
+        if value < 0:
+            return 0
+        if value == 0:
+            return self.zero_count
+        limit = self._index(value)
+        return self.zero_count + sum(count for index, count in self.buckets.items() if index <= limit)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        return {'relative_accuracy': self.relative_accuracy, 'zero_count': self.zero_count,
+                'count': self.count, 'total': self.total, 'min': self.min, 'max': self.max,
+                'buckets': {str(index): count for index, count in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.buckets.update((int(index), count) for index, count in data['buckets'].items())
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.total = data['total']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        return sketch
+
+class LatencySketches:
+    """One sketch per service and per (service, operation)"""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.sketches = {}
+
+    def sketch(self, service, operation=None):
+        key = (service, operation)
+        if key not in self.sketches:
+            self.sketches[key] = LatencySketch(self.relative_accuracy)
+        return self.sketches[key]
+
+    def record(self, service, operation, duration):
+        self.sketch(service).add(duration)
+        self.sketch(service, operation).add(duration)
+
+    def record_trace(self, trace):
+        for span in trace.get('spans', []):
+            self.record(span.get('process', {}).get('serviceName', 'unknown'),
+                        span.get('operationName', 'unknown'), span.get('duration', 0))
+
+    def record_store(self, store, limit=None):
+        """Fold in the spans of a SpanStore's first limit traces, vectorized per (service, operation)"""
+        rows = np.arange(len(store)) if limit is None else np.flatnonzero(store.trace < limit)
+        if not len(rows):
+            return
+        keys = store.service[rows].astype(np.int64) * len(store.operations) + store.operation[rows]
+        by_key = np.argsort(keys, kind='stable')
+        bounds = np.flatnonzero(np.diff(keys[by_key])) + 1
+        for group in np.split(rows[by_key], bounds):
+            row = group[0]
+            durations = store.duration[group]
+            service = store.services[store.service[row]]
+            self.sketch(service).add_many(durations)
+            self.sketch(service, store.operations[store.operation[row]]).add_many(durations)
+
+    def merge(self, other):
+        for (service, operation), sketch in other.sketches.items():
+            self.sketch(service, operation).merge(sketch)
+        return self
+
+    def to_dict(self):
+        return {'relative_accuracy': self.relative_accuracy,
+                'sketches': [[service, operation, sketch.to_dict()]
+                             for (service, operation), sketch in self.sketches.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketches = cls(data['relative_accuracy'])
+        for service, operation, sketch in data['sketches']:
+            sketches.sketches[(service, operation)] = LatencySketch.from_dict(sketch)
+        return sketches
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def services(self):
+        return sorted({service for service, _ in self.sketches})
+
+    def operations(self, service):
+        return sorted(operation for name, operation in self.sketches if name == service and operation is not None)
@@ -1,61 +1,60 @@
-import os
 import time
 import random
 import requests
 from flask import Flask, jsonify, request
 from opentelemetry import trace, baggage
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.resources import Resource
 from opentelemetry.instrumentation.flask import FlaskInstrumentor
 from opentelemetry.instrumentation.requests import RequestsInstrumentor
 
-# Configure OpenTelemetry
-resource = Resource.create({
-    "service.name": "order-service",
-    "service.version": "1.0.0"
-})
+import tracing
+import metrics
+import downstream
+import order_listing
+from order_repository import OrderRepository, sample_orders
 
-trace.set_tracer_provider(TracerProvider(resource=resource))
 tracer = trace.get_tracer(__name__)
 
-# Configure OTLP exporter
-otlp_exporter = OTLPSpanExporter(
-    endpoint=os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", 
-                      "http://otel-collector.observability.svc.cluster.local:4318/v1/traces")
-)
-span_processor = BatchSpanProcessor(otlp_exporter)
-trace.get_tracer_provider().add_span_processor(span_processor)
-
 app = Flask(__name__)
 
 # Auto-instrument Flask and requests
-FlaskInstrumentor().instrument_app(app)
+FlaskInstrumentor().instrument_app(app, excluded_urls="metrics")
 RequestsInstrumentor().instrument()
 
 # Sample orders data
-orders = [
-    {"id": 1, "user_id": 1, "items": [{"product_id": 101, "quantity": 2}], "total": 99.98, "status": "completed"},
-    {"id": 2, "user_id": 2, "items": [{"product_id": 102, "quantity": 1}], "total": 49.99, "status": "pending"}
-]
+orders = OrderRepository(sample_orders())
 
 @app.route('/health')
 def health():
     return jsonify({"status": "healthy", "service": "order-service"})
 
+@app.route('/metrics')
+def service_metrics():
+    return metrics.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
 @app.route('/orders')
 def get_orders():
     with tracer.start_as_current_span("get_all_orders") as span:
+        try:
+            query = order_listing.parse_query(request.args)
+        except order_listing.QueryError as e:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            return jsonify({"error": str(e)}), 400
+        
         # Simulate database query
         time.sleep(random.uniform(0.01, 0.1))
         
+        page, cursor = order_listing.list_orders(orders, query)
         span.set_attributes({
             "order.count": len(orders),
+            "orders.returned": len(page),
+            "page.limit": query['limit'],
             "operation.type": "read"
         })
         
-        return jsonify(orders)
+        response = jsonify(page)
+        if cursor:
+            response.headers.update(order_listing.next_page_headers(request.path, request.args.to_dict(), cursor))
+        return response
 
 @app.route('/orders/<int:order_id>')
 def get_order(order_id):
@@ -68,13 +67,83 @@ def get_order(order_id):
         # Simulate database lookup
         time.sleep(random.uniform(0.01, 0.05))
         
-        order = next((o for o in orders if o["id"] == order_id), None)
+        order = orders.get(order_id)
         if not order:
             span.set_status(trace.Status(trace.StatusCode.ERROR, "Order not found"))
             return jsonify({"error": "Order not found"}), 404
         
         return jsonify(order)
 
+def verify_user(user_id):
+    """Call user-service; returns an error (body, status) or None"""
+    with tracer.start_as_current_span("verify_user") as user_span:
+        try:
+            user_response = downstream.get(f"{downstream.USER_SERVICE_URL}/users/{user_id}")
+            user_span.set_attributes({
+                "http.status_code": user_response.status_code,
+                "user.id": user_id
+            })
+            
+            if user_response.status_code != 200:
+                return {"error": "Invalid user"}, 400
+        except requests.RequestException as e:
+            user_span.record_exception(e)
+            return {"error": "User service unavailable"}, 503
+    return None
+
+def check_item(item):
+    return downstream.get(f"{downstream.INVENTORY_SERVICE_URL}/inventory/{item['product_id']}")
+
+def check_inventory_items(items, inv_span):
+    """One request per item, concurrently; returns an error (body, status) or None"""
+    inventory_error = None
+    for item, check in zip(items, downstream.fan_out(check_item, items)):
+        try:
+            inv_response = check.result()
+            if inventory_error is None:
+                inv_span.set_attributes({
+                    "product.id": item['product_id'],
+                    "requested.quantity": item['quantity']
+                })
+            
+            if inv_response.status_code != 200 and inventory_error is None:
+                inventory_error = {"error": f"Product {item['product_id']} not found"}, 400
+                
+        except requests.RequestException as e:
+            inv_span.record_exception(e)
+            if inventory_error is None:
+                inventory_error = {"error": "Inventory service unavailable"}, 503
+    return inventory_error
+
+def check_inventory_batch(items, inv_span):
+    """One request for all items; returns an error, None, or NotImplemented without the batch API"""
+    try:
+        inv_response = downstream.post(
+            f"{downstream.INVENTORY_SERVICE_URL}/inventory/batch",
+            {"items": [{"product_id": item['product_id'], "quantity": item['quantity']} for item in items]}
+        )
+    except requests.RequestException as e:
+        inv_span.record_exception(e)
+        return {"error": "Inventory service unavailable"}, 503
+    
+    if inv_response.status_code in (404, 405, 501):
+        downstream.inventory_batch_unsupported()
+        return NotImplemented
+    if inv_response.status_code == 413:
+        # Larger than the service's batch limit: check this order item by item
+        return NotImplemented
+    if inv_response.status_code != 200:
+        return {"error": "Inventory service unavailable"}, 503
+    
+    for item, result in zip(items, inv_response.json()['items']):
+        if not result.get('found'):
+            inv_span.set_attributes({
+                "product.id": item['product_id'],
+                "requested.quantity": item['quantity']
+            })
+            return {"error": f"Product {item['product_id']} not found"}, 400
+    return None
+
 @app.route('/orders', methods=['POST'])
 def create_order():
     with tracer.start_as_current_span("create_order") as span:
@@ -88,54 +157,31 @@ def create_order():
             "operation.type": "write"
         })
         
-        # Verify user exists (call user service)
-        with tracer.start_as_current_span("verify_user") as user_span:
-            try:
-                user_response = requests.get(
-                    f"http://user-service:3001/users/{user_id}",
-                    timeout=5
-                )
-                user_span.set_attributes({
-                    "http.status_code": user_response.status_code,
-                    "user.id": user_id
-                })
-                
-                if user_response.status_code != 200:
-                    return jsonify({"error": "Invalid user"}), 400
-            except requests.RequestException as e:
-                user_span.record_exception(e)
-                return jsonify({"error": "User service unavailable"}), 503
+        # Verify user exists (call user service), overlapped with the inventory checks
+        user_check = downstream.submit(verify_user, user_id)
         
-        # Check inventory (call inventory service)
+        # Check inventory (call inventory service): one batch request, or items concurrently
+        inventory_error = NotImplemented
         with tracer.start_as_current_span("check_inventory") as inv_span:
-            for item in items:
-                try:
-                    inv_response = requests.get(
-                        f"http://inventory-service:3003/inventory/{item['product_id']}",
-                        timeout=5
-                    )
-                    inv_span.set_attributes({
-                        "product.id": item['product_id'],
-                        "requested.quantity": item['quantity']
-                    })
-                    
-                    if inv_response.status_code != 200:
-                        return jsonify({"error": f"Product {item['product_id']} not found"}), 400
-                        
-                except requests.RequestException as e:
-                    inv_span.record_exception(e)
-                    return jsonify({"error": "Inventory service unavailable"}), 503
+            if items and downstream.inventory_batch_enabled():
+                inventory_error = check_inventory_batch(items, inv_span)
+            inv_span.set_attribute("inventory.batch", inventory_error is not NotImplemented)
+            if inventory_error is NotImplemented:
+                inv_span.set_attribute("inventory.concurrency", downstream.INVENTORY_CONCURRENCY)
+                inventory_error = check_inventory_items(items, inv_span)
         
-        # Create order
-        new_order = {
-            "id": len(orders) + 1,
-            "user_id": user_id,
-            "items": items,
-            "total": sum(item.get('price', 25.99) * item['quantity'] for item in items),
-            "status": "pending"
-        }
+        # Same precedence as the sequential checks: user errors first
+        user_error = user_check.result()
+        if user_error or inventory_error:
+            body, status = user_error or inventory_error
+            return jsonify(body), status
         
-        orders.append(new_order)
+        # Create order (the repository allocates the id atomically)
+        new_order = orders.create(
+            user_id,
+            items,
+            sum(item.get('price', 25.99) * item['quantity'] for item in items)
+        )
         
         span.set_attributes({
             "order.id": new_order["id"],
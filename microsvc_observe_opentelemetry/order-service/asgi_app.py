@@ -0,0 +1,233 @@
+# Async (ASGI) serving mode for order-service
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 3002
+#   python3 asgi_app.py
+#
+# The same API and spans as app.py, served from one event loop: the
+# simulated DB latency is asyncio.sleep and downstream calls go through
+# downstream_async's shared httpx.AsyncClient, so an in-flight order holds
+# a coroutine instead of a worker thread. Requests are traced by the ASGI
+# middleware and outgoing calls by the httpx instrumentation.
+import random
+import asyncio
+import contextlib
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from opentelemetry import trace
+from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.util.http import parse_excluded_urls
+
+import tracing
+import metrics
+import downstream
+import downstream_async
+import order_listing
+from order_repository import OrderRepository, sample_orders
+
+tracer = trace.get_tracer(__name__)
+
+# Auto-instrument httpx (the ASGI middleware is added to the app below)
+HTTPXClientInstrumentor().instrument()
+
+# Sample orders data
+orders = OrderRepository(sample_orders())
+
+async def health(request):
+    return JSONResponse({"status": "healthy", "service": "order-service"})
+
+async def service_metrics(request):
+    return Response(metrics.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+async def get_orders(request):
+    with tracer.start_as_current_span("get_all_orders") as span:
+        try:
+            query = order_listing.parse_query(request.query_params)
+        except order_listing.QueryError as e:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            return JSONResponse({"error": str(e)}, 400)
+
+        # Simulate database query
+        await asyncio.sleep(random.uniform(0.01, 0.1))
+
+        page, cursor = order_listing.list_orders(orders, query)
+        span.set_attributes({
+            "order.count": len(orders),
+            "orders.returned": len(page),
+            "page.limit": query['limit'],
+            "operation.type": "read"
+        })
+
+        headers = None
+        if cursor:
+            headers = order_listing.next_page_headers(request.url.path, dict(request.query_params), cursor)
+        return JSONResponse(page, headers=headers)
+
+async def get_order(request):
+    order_id = request.path_params['order_id']
+    with tracer.start_as_current_span("get_order_by_id") as span:
+        span.set_attributes({
+            "order.id": order_id,
+            "operation.type": "read"
+        })
+
+        # Simulate database lookup
+        await asyncio.sleep(random.uniform(0.01, 0.05))
+
+        order = orders.get(order_id)
+        if not order:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, "Order not found"))
+            return JSONResponse({"error": "Order not found"}, 404)
+
+        return JSONResponse(order)
+
+async def verify_user(user_id):
+    """Call user-service; returns an error (body, status) or None"""
+    with tracer.start_as_current_span("verify_user") as user_span:
+        try:
+            user_response = await downstream_async.get(f"{downstream.USER_SERVICE_URL}/users/{user_id}")
+            user_span.set_attributes({
+                "http.status_code": user_response.status_code,
+                "user.id": user_id
+            })
+
+            if user_response.status_code != 200:
+                return {"error": "Invalid user"}, 400
+        except httpx.HTTPError as e:
+            user_span.record_exception(e)
+            return {"error": "User service unavailable"}, 503
+    return None
+
+async def check_item(item):
+    return await downstream_async.get(f"{downstream.INVENTORY_SERVICE_URL}/inventory/{item['product_id']}")
+
+async def check_inventory_items(items, inv_span):
+    """One request per item, concurrently; returns an error (body, status) or None"""
+    inventory_error = None
+    for item, inv_response in zip(items, await downstream_async.fan_out(check_item, items)):
+        if isinstance(inv_response, httpx.HTTPError):
+            inv_span.record_exception(inv_response)
+            if inventory_error is None:
+                inventory_error = {"error": "Inventory service unavailable"}, 503
+            continue
+        if isinstance(inv_response, BaseException):
+            raise inv_response
+
+        if inventory_error is None:
+            inv_span.set_attributes({
+                "product.id": item['product_id'],
+                "requested.quantity": item['quantity']
+            })
+
+        if inv_response.status_code != 200 and inventory_error is None:
+            inventory_error = {"error": f"Product {item['product_id']} not found"}, 400
+    return inventory_error
+
+async def check_inventory_batch(items, inv_span):
+    """One request for all items; returns an error, None, or NotImplemented without the batch API"""
+    try:
+        inv_response = await downstream_async.post(
+            f"{downstream.INVENTORY_SERVICE_URL}/inventory/batch",
+            {"items": [{"product_id": item['product_id'], "quantity": item['quantity']} for item in items]}
+        )
+    except httpx.HTTPError as e:
+        inv_span.record_exception(e)
+        return {"error": "Inventory service unavailable"}, 503
+
+    if inv_response.status_code in (404, 405, 501):
+        downstream.inventory_batch_unsupported()
+        return NotImplemented
+    if inv_response.status_code == 413:
+        # Larger than the service's batch limit: check this order item by item
+        return NotImplemented
+    if inv_response.status_code != 200:
+        return {"error": "Inventory service unavailable"}, 503
+
+    for item, result in zip(items, inv_response.json()['items']):
+        if not result.get('found'):
+            inv_span.set_attributes({
+                "product.id": item['product_id'],
+                "requested.quantity": item['quantity']
+            })
+            return {"error": f"Product {item['product_id']} not found"}, 400
+    return None
+
+async def create_order(request):
+    with tracer.start_as_current_span("create_order") as span:
+        try:
+            data = await request.json()
+        except ValueError:
+            return JSONResponse({"error": "Invalid JSON body"}, 400)
+        user_id = data.get('user_id')
+        items = data.get('items', [])
+
+        span.set_attributes({
+            "order.user_id": user_id,
+            "order.items_count": len(items),
+            "operation.type": "write"
+        })
+
+        # Verify user exists (call user service), overlapped with the inventory checks;
+        # the task copies the current context, so verify_user keeps create_order as parent
+        user_check = asyncio.create_task(verify_user(user_id))
+
+        # Check inventory (call inventory service): one batch request, or items concurrently
+        inventory_error = NotImplemented
+        try:
+            with tracer.start_as_current_span("check_inventory") as inv_span:
+                if items and downstream.inventory_batch_enabled():
+                    inventory_error = await check_inventory_batch(items, inv_span)
+                inv_span.set_attribute("inventory.batch", inventory_error is not NotImplemented)
+                if inventory_error is NotImplemented:
+                    inv_span.set_attribute("inventory.concurrency", downstream.INVENTORY_CONCURRENCY)
+                    inventory_error = await check_inventory_items(items, inv_span)
+        except BaseException:
+            # Do not leave verify_user running, or its exception unretrieved
+            user_check.cancel()
+            await asyncio.gather(user_check, return_exceptions=True)
+            raise
+
+        # Same precedence as the sequential checks: user errors first
+        user_error = await user_check
+        if user_error or inventory_error:
+            body, status = user_error or inventory_error
+            return JSONResponse(body, status)
+
+        # Create order (the repository allocates the id atomically)
+        new_order = orders.create(
+            user_id,
+            items,
+            sum(item.get('price', 25.99) * item['quantity'] for item in items)
+        )
+
+        span.set_attributes({
+            "order.id": new_order["id"],
+            "order.total": new_order["total"]
+        })
+
+        return JSONResponse(new_order, 201)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await downstream_async.aclose()
+
+app = Starlette(
+    routes=[
+        Route('/health', health),
+        Route('/metrics', service_metrics),
+        Route('/orders', get_orders, methods=['GET']),
+        Route('/orders', create_order, methods=['POST']),
+        Route('/orders/{order_id:int}', get_order),
+    ],
+    middleware=[Middleware(OpenTelemetryMiddleware, excluded_urls=parse_excluded_urls("metrics"))],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=3002)
@@ -0,0 +1,94 @@
+# Benchmark the Flask app against the ASGI serving mode under concurrent load
+#
+#   python3 benchmark_asgi.py --concurrency 2000 --latency 20
+#
+# Starts inventory_stub.py in-process, then fires --concurrency requests
+# at once at each app: the Flask app from a pool of --threads workers
+# (like gunicorn --threads), the ASGI app from one event loop through
+# httpx's ASGI transport. Measures order creation (user check plus one
+# batch inventory request) and order lookups (simulated DB latency).
+# Tracing is off (TRACE_SAMPLING=off), so the span exporter is not measured.
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import inventory_stub
+
+ORDER = {"user_id": 1, "items": [{"product_id": i + 1, "quantity": 1} for i in range(10)]}
+
+def start_stub(latency):
+    server = inventory_stub.serve(port=0, latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def report(name, wall, timings):
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:28} {len(timings) / wall:9.0f}/s {statistics.median(timings) * 1000:9.1f}ms "
+          f"{p99 * 1000:9.1f}ms")
+
+def run_flask(app, path, concurrency, threads):
+    def call(_):
+        client = app.app.test_client()
+        start = time.perf_counter()
+        response = client.post(path, json=ORDER) if path == '/orders' else client.get(path)
+        assert response.status_code in (200, 201), response.get_json()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        timings = list(pool.map(call, range(concurrency)))
+    return time.perf_counter() - start, timings
+
+async def run_asgi(client, path, concurrency):
+    async def call():
+        start = time.perf_counter()
+        response = await (client.post(path, json=ORDER) if path == '/orders' else client.get(path))
+        assert response.status_code in (200, 201), response.json()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(call() for _ in range(concurrency)))
+    return time.perf_counter() - start, list(timings)
+
+async def asgi_rows(asgi_app, concurrency):
+    import httpx
+    import downstream_async
+    transport = httpx.ASGITransport(app=asgi_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://order-service', timeout=None) as client:
+        # Open the downstream connections before timing
+        await run_asgi(client, '/orders', min(concurrency, 64))
+        rows = [('asgi create, 1 loop', await run_asgi(client, '/orders', concurrency)),
+                ('asgi lookup, 1 loop', await run_asgi(client, '/orders/1', concurrency))]
+    await downstream_async.aclose()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Flask vs ASGI order-service under concurrency')
+    parser.add_argument('--latency', type=float, default=20, help='Stub latency per request, ms')
+    parser.add_argument('--concurrency', type=int, default=2000, help='Requests in flight at once')
+    parser.add_argument('--threads', type=int, default=16, help='Flask worker threads')
+    args = parser.parse_args()
+
+    url = start_stub(args.latency / 1000)
+    os.environ.setdefault('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT', 'http://127.0.0.1:9/v1/traces')
+    os.environ['TRACE_SAMPLING'] = 'off'
+    os.environ['USER_SERVICE_URL'] = url
+    os.environ['INVENTORY_SERVICE_URL'] = url
+    import app
+    import asgi_app
+
+    print(f"stub latency {args.latency}ms, {args.concurrency} concurrent requests")
+    print(f"{'mode':28} {'throughput':>11} {'median':>11} {'p99':>11}")
+    report(f'flask create, {args.threads} threads', *run_flask(app, '/orders', args.concurrency, args.threads))
+    report(f'flask lookup, {args.threads} threads', *run_flask(app, '/orders/1', args.concurrency, args.threads))
+    for name, (wall, timings) in asyncio.run(asgi_rows(asgi_app, args.concurrency)):
+        report(name, wall, timings)
+
+if __name__ == "__main__":
+    sys.exit(main())
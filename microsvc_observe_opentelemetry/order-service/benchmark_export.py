@@ -0,0 +1,81 @@
+# Throughput of order-service's span export pipeline against a slow collector
+#
+#   python3 benchmark_export.py --spans 100000 --rate 20000 --latency 50
+#
+# Starts otlp_sink.py in-process with --latency ms per export, then for
+# each pipeline setting creates --spans spans at --rate per second through a
+# private TracerProvider built by export_pipeline.make_processor. Reports
+# spans received by the sink, spans dropped at the queue, mean export
+# latency and bytes on the wire. No Flask needed.
+import sys
+import time
+import argparse
+import threading
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.resources import Resource
+
+import otlp_sink
+import export_pipeline
+
+SETTINGS = [
+    ('defaults', {}),
+    ('batch 2048, queue 8192', {'batch_size': 2048, 'queue_size': 8192}),
+    ('4 exporters', {'concurrency': 4}),
+    ('4 exporters, gzip', {'concurrency': 4, 'compression': 'gzip'}),
+    ('4 exporters, batch 2048', {'concurrency': 4, 'batch_size': 2048, 'queue_size': 8192}),
+]
+
+def run(endpoint, sink, settings, spans, rate):
+    provider = TracerProvider(resource=Resource.create({"service.name": "order-service"}))
+    provider.add_span_processor(export_pipeline.make_processor(endpoint=endpoint, schedule_delay_millis=200,
+                                                               **settings))
+    tracer = provider.get_tracer(__name__)
+    received, dropped = sink.stats.snapshot(), export_pipeline.DROPPED.samples()
+    exports, export_seconds = export_pipeline.EXPORT_DURATION.count, export_pipeline.EXPORT_DURATION.sum
+
+    start = time.perf_counter()
+    for i in range(spans):
+        if i % 100 == 0:
+            # Pace the producer, like requests arriving at --rate spans per second
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        with tracer.start_as_current_span("check_inventory") as span:
+            span.set_attributes({"product.id": i, "requested.quantity": 1, "inventory.batch": True})
+    provider.shutdown()
+    elapsed = time.perf_counter() - start
+
+    after = sink.stats.snapshot()
+    dropped = sum(value for _, value in export_pipeline.DROPPED.samples()) - sum(value for _, value in dropped)
+    exports = export_pipeline.EXPORT_DURATION.count - exports
+    mean_ms = (export_pipeline.EXPORT_DURATION.sum - export_seconds) / exports * 1000 if exports else 0
+    return {
+        "received": after["spans"] - received["spans"],
+        "dropped": dropped,
+        "exports": exports,
+        "mean_ms": mean_ms,
+        "wire_mb": (after["wire_bytes"] - received["wire_bytes"]) / 1e6,
+        "elapsed": elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark span export settings against a slow collector')
+    parser.add_argument('--spans', type=int, default=100000, help='Spans per setting')
+    parser.add_argument('--rate', type=float, default=20000, help='Spans produced per second')
+    parser.add_argument('--latency', type=float, default=50, help='Collector latency per export, ms')
+    args = parser.parse_args()
+
+    sink = otlp_sink.serve(port=0, latency=args.latency / 1000)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{sink.server_port}/v1/traces"
+
+    print(f"{args.spans} spans at {args.rate:.0f}/s, collector latency {args.latency}ms")
+    print(f"{'setting':26} {'received':>9} {'dropped':>9} {'exports':>8} {'export':>9} {'wire':>8} {'elapsed':>8}")
+    for name, settings in SETTINGS:
+        result = run(endpoint, sink, settings, args.spans, args.rate)
+        print(f"{name:26} {result['received']:9} {result['dropped']:9} {result['exports']:8} "
+              f"{result['mean_ms']:7.1f}ms {result['wire_mb']:6.1f}MB {result['elapsed']:7.2f}s")
+
+if __name__ == "__main__":
+    sys.exit(main())
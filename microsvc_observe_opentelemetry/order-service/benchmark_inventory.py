@@ -0,0 +1,63 @@
+# Benchmark create_order's inventory checks against the local stub
+#
+#   python3 benchmark_inventory.py --latency 20
+#
+# Starts inventory_stub.py in-process (with and without the batch API),
+# then times POST /orders through Flask's test client for 1, 10 and 100
+# item orders: batch request, concurrent per-item requests, and the old
+# one-at-a-time behaviour (INVENTORY_CONCURRENCY=1). Tracing is off
+# (TRACE_SAMPLING=off), so the span exporter is not measured.
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+
+import inventory_stub
+
+def start_stub(latency, batch):
+    server = inventory_stub.serve(port=0, latency=latency, batch=batch)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch vs per-item inventory checks')
+    parser.add_argument('--latency', type=float, default=20, help='Stub latency per request, ms')
+    parser.add_argument('--requests', type=int, default=20, help='Orders per measurement')
+    args = parser.parse_args()
+
+    batch_url = start_stub(args.latency / 1000, batch=True)
+    plain_url = start_stub(args.latency / 1000, batch=False)
+    os.environ.setdefault('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT', 'http://127.0.0.1:9/v1/traces')
+    os.environ['TRACE_SAMPLING'] = 'off'
+    os.environ['USER_SERVICE_URL'] = batch_url
+    import app
+    import downstream
+    client = app.app.test_client()
+
+    modes = [
+        ('batch', batch_url, 'auto', downstream.INVENTORY_CONCURRENCY),
+        ('per-item, concurrent', plain_url, 'off', downstream.INVENTORY_CONCURRENCY),
+        ('per-item, sequential', plain_url, 'off', 1),
+    ]
+    print(f"stub latency {args.latency}ms, median of {args.requests} orders")
+    print(f"{'mode':22} {'1 item':>10} {'10 items':>10} {'100 items':>10}")
+    for name, url, batch, concurrency in modes:
+        downstream.INVENTORY_SERVICE_URL = url
+        downstream.INVENTORY_BATCH = batch
+        downstream.INVENTORY_CONCURRENCY = concurrency
+        row = []
+        for count in (1, 10, 100):
+            order = {"user_id": 1, "items": [{"product_id": i + 1, "quantity": 1} for i in range(count)]}
+            timings = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.post('/orders', json=order)
+                timings.append(time.perf_counter() - start)
+                assert response.status_code == 201, response.get_json()
+            row.append(f"{statistics.median(timings) * 1000:8.1f}ms")
+        print(f"{name:22} {' '.join(row)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
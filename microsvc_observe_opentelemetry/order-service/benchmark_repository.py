@@ -0,0 +1,88 @@
+# Load benchmark for OrderRepository (no Flask or OpenTelemetry needed)
+#
+#   python3 benchmark_repository.py --orders 1000000
+#
+# Times id lookups, indexed queries and GET /orders pages as the store
+# grows, against the previous linear scan and whole-list response, and
+# checks that concurrent creates never reuse an id.
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+
+import order_listing
+from order_repository import OrderRepository
+
+STATUSES = ['pending', 'completed', 'shipped', 'cancelled']
+
+def per_call_us(function, args, repeat):
+    start = time.perf_counter()
+    for arg in args[:repeat]:
+        function(arg)
+    return (time.perf_counter() - start) / min(repeat, len(args)) * 1e6
+
+def fill(repository, count, users, rng):
+    for _ in range(count):
+        repository.create(rng.randrange(users), [{"product_id": 101, "quantity": 1}], 25.99,
+                          rng.choice(STATUSES))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the order repository')
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    repository = OrderRepository()
+    print(f"{'orders':>10} {'get us':>8} {'scan us':>10} {'by user us':>11} {'user+status us':>15} "
+          f"{'page us':>8} {'list all ms':>12}")
+    size = 0
+    for target in [n for n in (1000, 10000, 100000, 1000000, 10000000) if n < args.orders] + [args.orders]:
+        fill(repository, target - size, args.users, rng)
+        size = target
+        ids = [rng.randint(1, size) for _ in range(args.lookups)]
+        users = [rng.randrange(args.users) for _ in range(1000)]
+        orders = repository.page(limit=size)[0]
+        get_us = per_call_us(repository.get, ids, args.lookups)
+        # The previous implementation: next(...) over the orders list
+        scan_us = per_call_us(lambda order_id: next((o for o in orders if o["id"] == order_id), None), ids, 20)
+        # First 50-order page of a user, and of a user's pending orders
+        user_us = per_call_us(lambda user_id: repository.page(user_id), users, 1000)
+        both_us = per_call_us(lambda user_id: repository.page(user_id, 'pending'), users, 1000)
+        # GET /orders: a serialized 50-order page from a random cursor, against the whole list
+        cursors = [order_listing.encode_cursor(order_id) for order_id in ids[:1000]]
+        page_us = per_call_us(lambda cursor: json.dumps(order_listing.list_orders(
+            repository, order_listing.parse_query({'cursor': cursor, 'limit': '50'}))[0]), cursors, 1000)
+        all_ms = per_call_us(lambda _: json.dumps(repository.page(limit=size)[0]), [None], 1) / 1000
+        print(f"{size:>10} {get_us:>8.2f} {scan_us:>10.1f} {user_us:>11.2f} {both_us:>15.2f} "
+              f"{page_us:>8.1f} {all_ms:>12.1f}")
+
+    # Concurrent creates: every id must be unique and contiguous
+    before = len(repository)
+    per_thread = 10000
+    created = [[] for _ in range(args.threads)]
+
+    def create_many(out):
+        for _ in range(per_thread):
+            out.append(repository.create(1, [], 0.0)["id"])
+
+    threads = [threading.Thread(target=create_many, args=(out,)) for out in created]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ids = [order_id for out in created for order_id in out]
+    unique = len(set(ids)) == len(ids) == args.threads * per_thread
+    contiguous = sorted(ids) == list(range(before + 1, before + len(ids) + 1))
+    print(f"\n{len(ids)} concurrent creates on {args.threads} threads in {elapsed:.2f}s: "
+          f"ids unique={unique} contiguous={contiguous}")
+    return 0 if unique and contiguous else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
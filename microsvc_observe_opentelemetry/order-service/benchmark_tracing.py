@@ -0,0 +1,77 @@
+# Per-request cost of tracing under each sampling policy
+#
+#   python3 benchmark_tracing.py --requests 2000
+#
+# Runs the Flask app once per TRACE_SAMPLING policy, each in a fresh
+# process (the tracer provider is global), against inventory_stub.py with
+# no latency and otlp_sink.py (not decoding) as the collector. Reports
+# wall and CPU time per POST /orders, including the exporter thread's
+# share, and the sampling decisions made.
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+
+import otlp_sink
+import inventory_stub
+
+POLICIES = ('off', 'always', 'head', 'tail')
+ORDER = {"user_id": 1, "items": [{"product_id": i + 1, "quantity": 1} for i in range(10)]}
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def measure(requests):
+    """Child process: time POST /orders with the policy in TRACE_SAMPLING"""
+    stub_url = start(inventory_stub.serve(port=0, latency=0))
+    sink_url = start(otlp_sink.serve(port=0, decode=False))
+    os.environ['OTEL_EXPORTER_OTLP_TRACES_ENDPOINT'] = f"{sink_url}/v1/traces"
+    os.environ['USER_SERVICE_URL'] = stub_url
+    os.environ['INVENTORY_SERVICE_URL'] = stub_url
+    import app
+    import sampling
+    client = app.app.test_client()
+    for _ in range(50):
+        client.post('/orders', json=ORDER)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(requests):
+        response = client.post('/orders', json=ORDER)
+        assert response.status_code == 201, response.get_json()
+    # Count the export of these requests' spans too
+    app.trace.get_tracer_provider().force_flush()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    decisions = {}
+    for labels, value in sampling.DECISIONS.samples():
+        labels = dict(labels)
+        name = f"{labels['sampler']} {labels['decision']}"
+        decisions[name] = decisions.get(name, 0) + value
+    print(json.dumps({"wall_us": wall / requests * 1e6, "cpu_us": cpu / requests * 1e6,
+                      "decisions": decisions}))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tracing overhead per sampling policy')
+    parser.add_argument('--requests', type=int, default=2000, help='Orders per policy')
+    parser.add_argument('--rate', type=float, default=10, help='TRACE_SAMPLE_RATE, traces per second')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return measure(args.requests)
+
+    print(f"{args.requests} orders per policy, sample rate {args.rate}/s")
+    print(f"{'policy':8} {'wall/req':>10} {'cpu/req':>10}  decisions")
+    for policy in POLICIES:
+        env = dict(os.environ, TRACE_SAMPLING=policy, TRACE_SAMPLE_RATE=str(args.rate))
+        output = subprocess.run([sys.executable, __file__, '--child', '--requests', str(args.requests)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        decisions = ', '.join(f"{name} {count}" for name, count in sorted(result['decisions'].items()))
+        print(f"{policy:8} {result['wall_us']:8.0f}us {result['cpu_us']:8.0f}us  {decisions or '-'}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# Shared HTTP client and fan-out pool for order-service's downstream calls
+#
+# One requests.Session keeps connections to user-service and
+# inventory-service alive across requests; calls that can overlap run on
+# a shared thread pool, inside the caller's OpenTelemetry context so
+# their spans keep the right parents.
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from opentelemetry import context
+
+USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:3001")
+INVENTORY_SERVICE_URL = os.getenv("INVENTORY_SERVICE_URL", "http://inventory-service:3003")
+REQUEST_TIMEOUT = float(os.getenv("DOWNSTREAM_TIMEOUT", "5"))
+# Connection pools kept (one per host) and connections kept per host
+POOL_CONNECTIONS = int(os.getenv("DOWNSTREAM_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.getenv("DOWNSTREAM_POOL_MAXSIZE", "32"))
+# Threads shared by all requests, and in-flight inventory checks per order
+FANOUT_WORKERS = int(os.getenv("DOWNSTREAM_FANOUT_WORKERS", "32"))
+INVENTORY_CONCURRENCY = int(os.getenv("INVENTORY_CONCURRENCY", "8"))
+# POST /inventory/batch: "auto" (use it while the service supports it), "on" or "off"
+INVENTORY_BATCH = os.getenv("INVENTORY_BATCH", "auto")
+# After the service answered without the batch API, retry it this much later
+INVENTORY_BATCH_RETRY = float(os.getenv("INVENTORY_BATCH_RETRY", "300"))
+
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
+executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='downstream')
+
+_batch_retry_at = 0.0
+
+def get(url):
+    return session.get(url, timeout=REQUEST_TIMEOUT)
+
+def post(url, payload):
+    return session.post(url, json=payload, timeout=REQUEST_TIMEOUT)
+
+def inventory_batch_enabled():
+    return INVENTORY_BATCH == "on" or (INVENTORY_BATCH == "auto" and time.monotonic() >= _batch_retry_at)
+
+def inventory_batch_unsupported():
+    """Fall back to per-item checks until INVENTORY_BATCH_RETRY has passed"""
+    global _batch_retry_at
+    _batch_retry_at = time.monotonic() + INVENTORY_BATCH_RETRY
+
+def submit(fn, *args):
+    """Run fn(*args) on the shared pool inside the caller's trace context"""
+    ctx = context.get_current()
+
+    def run():
+        token = context.attach(ctx)
+        try:
+            return fn(*args)
+        finally:
+            context.detach(token)
+
+    return executor.submit(run)
+
+def fan_out(fn, items, concurrency=None):
+    """Submit fn(item) for every item, at most concurrency in flight; futures in item order"""
+    slots = threading.Semaphore(concurrency or INVENTORY_CONCURRENCY)
+    futures = []
+    for item in items:
+        slots.acquire()
+        future = submit(fn, item)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return futures
@@ -0,0 +1,51 @@
+# Async HTTP client for order-service's downstream calls (ASGI mode)
+#
+# The asyncio counterpart of downstream.py: one httpx.AsyncClient keeps
+# connections to user-service and inventory-service alive across
+# requests, and fan_out bounds the in-flight calls of an order with a
+# semaphore instead of a thread pool. Service URLs, timeout, per-order
+# concurrency and the batch API switch are downstream.py's.
+import os
+import asyncio
+
+import httpx
+
+import downstream
+
+# Connections open at once (all hosts) and kept idle for reuse
+MAX_CONNECTIONS = int(os.getenv("DOWNSTREAM_ASYNC_MAX_CONNECTIONS", "256"))
+MAX_KEEPALIVE = int(os.getenv("DOWNSTREAM_ASYNC_MAX_KEEPALIVE", "64"))
+
+_client = None
+
+def client():
+    """The shared AsyncClient, created on first use inside the serving loop"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+            timeout=downstream.REQUEST_TIMEOUT
+        )
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def get(url):
+    return await client().get(url)
+
+async def post(url, payload):
+    return await client().post(url, json=payload)
+
+async def fan_out(fn, items, concurrency=None):
+    """Await fn(item) for every item, at most concurrency in flight; results or exceptions in item order"""
+    slots = asyncio.Semaphore(concurrency or downstream.INVENTORY_CONCURRENCY)
+
+    async def run(item):
+        async with slots:
+            return await fn(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
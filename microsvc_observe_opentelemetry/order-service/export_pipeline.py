@@ -0,0 +1,155 @@
+# Tunable span export pipeline for order-service
+#
+# Settings, with the standard OpenTelemetry names where one exists:
+#   OTEL_BSP_MAX_QUEUE_SIZE                spans buffered per exporter (2048)
+#   OTEL_BSP_MAX_EXPORT_BATCH_SIZE         spans per OTLP request (512)
+#   OTEL_BSP_SCHEDULE_DELAY                ms before a partial batch is sent (5000)
+#   OTEL_EXPORTER_OTLP_TRACES_TIMEOUT      seconds allowed per OTLP request (10)
+#   OTEL_EXPORTER_OTLP_TRACES_COMPRESSION  none, gzip or deflate (none)
+#   TRACE_EXPORT_CONCURRENCY               exporters working in parallel (1)
+#
+# With a concurrency of N, spans are sharded by trace id over N batch
+# processors, each with its own queue, worker thread and OTLP connection,
+# so one slow request to the collector does not hold up the others. A
+# full queue never blocks a request: the oldest queued span is dropped
+# and counted. Queue depth, drops and export latency are in metrics.py;
+# they are counted here, without reading the SDK processor's internals.
+import os
+import time
+import threading
+
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.exporter.otlp.proto.http import Compression
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+import metrics
+
+ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT",
+                     "http://otel-collector.observability.svc.cluster.local:4318/v1/traces")
+MAX_QUEUE_SIZE = int(os.getenv("OTEL_BSP_MAX_QUEUE_SIZE", "2048"))
+MAX_EXPORT_BATCH_SIZE = int(os.getenv("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "512"))
+SCHEDULE_DELAY_MILLIS = float(os.getenv("OTEL_BSP_SCHEDULE_DELAY", "5000"))
+EXPORT_TIMEOUT = float(os.getenv("OTEL_EXPORTER_OTLP_TRACES_TIMEOUT", "10"))
+COMPRESSION = os.getenv("OTEL_EXPORTER_OTLP_TRACES_COMPRESSION", "none")
+EXPORT_CONCURRENCY = int(os.getenv("TRACE_EXPORT_CONCURRENCY", "1"))
+
+# Export duration histogram bounds, seconds
+EXPORT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+EXPORTED = metrics.counter('order_service_spans_exported_total',
+                           'Spans sent to the collector, by result')
+DROPPED = metrics.counter('order_service_spans_dropped_total',
+                          'Spans dropped because an export queue was full')
+EXPORT_DURATION = metrics.histogram('order_service_span_export_duration_seconds',
+                                    'Duration of one OTLP export request', EXPORT_BUCKETS)
+
+# Batch processors of the installed pipeline, for the queue gauges
+_shards = []
+
+metrics.gauge('order_service_span_export_queue_depth', 'Spans waiting in each export queue',
+              lambda: {(('shard', shard.shard),): shard.queued for shard in _shards})
+metrics.gauge('order_service_span_export_queue_capacity', 'Size of each export queue',
+              lambda: {(('shard', shard.shard),): shard.max_queue_size for shard in _shards})
+
+class MeteredExporter(SpanExporter):
+    """Time every export and count its spans by result
+
+    on_export(count), if given, is called as each batch is handed over.
+    """
+
+    def __init__(self, exporter, on_export=None):
+        self._exporter = exporter
+        self._on_export = on_export
+
+    def export(self, spans):
+        if self._on_export is not None:
+            self._on_export(len(spans))
+        start = time.perf_counter()
+        result = self._exporter.export(spans)
+        EXPORT_DURATION.observe(time.perf_counter() - start)
+        EXPORTED.inc(len(spans), result='success' if result is SpanExportResult.SUCCESS else 'failure')
+        return result
+
+    def shutdown(self):
+        self._exporter.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._exporter.force_flush(timeout_millis)
+
+class MeteredBatchSpanProcessor(SpanProcessor):
+    """A BatchSpanProcessor whose queue depth and drops are tracked from the outside
+
+    The depth is the sampled spans handed to the processor minus those
+    passed on to the exporter, so it relies on no private SDK attribute.
+    A span ending while the queue is full is counted as dropped (the SDK
+    drops the oldest queued span to make room for it).
+    """
+
+    def __init__(self, exporter, shard=0, max_queue_size=MAX_QUEUE_SIZE, **kwargs):
+        self.shard = shard
+        self.max_queue_size = max_queue_size
+        self.queued = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._processor = BatchSpanProcessor(MeteredExporter(exporter, self._exported),
+                                             max_queue_size=max_queue_size, **kwargs)
+
+    def on_start(self, span, parent_context=None):
+        self._processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        if span.context.trace_flags.sampled and not self._shutdown:
+            with self._lock:
+                if self.queued >= self.max_queue_size:
+                    DROPPED.inc(shard=self.shard)
+                else:
+                    self.queued += 1
+        self._processor.on_end(span)
+
+    def _exported(self, count):
+        with self._lock:
+            self.queued = max(self.queued - count, 0)
+
+    def shutdown(self):
+        self._shutdown = True
+        self._processor.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._processor.force_flush(timeout_millis)
+
+class ShardedSpanProcessor(SpanProcessor):
+    """Spread spans over batch processors by trace id, so a trace stays in one batch stream"""
+
+    def __init__(self, shards):
+        self._shards = shards
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span):
+        self._shards[span.context.trace_id % len(self._shards)].on_end(span)
+
+    def shutdown(self):
+        for shard in self._shards:
+            shard.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return all([shard.force_flush(timeout_millis) for shard in self._shards])
+
+def make_processor(endpoint=ENDPOINT, queue_size=MAX_QUEUE_SIZE, batch_size=MAX_EXPORT_BATCH_SIZE,
+                   schedule_delay_millis=SCHEDULE_DELAY_MILLIS, timeout=EXPORT_TIMEOUT,
+                   compression=COMPRESSION, concurrency=EXPORT_CONCURRENCY):
+    """Batch processor(s) exporting over OTLP/HTTP; the latest one made is the one metered"""
+    shards = []
+    for shard in range(max(concurrency, 1)):
+        exporter = OTLPSpanExporter(endpoint=endpoint, timeout=timeout, compression=Compression(compression))
+        shards.append(MeteredBatchSpanProcessor(
+            exporter,
+            shard,
+            max_queue_size=queue_size,
+            max_export_batch_size=min(batch_size, queue_size),
+            schedule_delay_millis=schedule_delay_millis
+        ))
+    _shards[:] = shards
+    return shards[0] if len(shards) == 1 else ShardedSpanProcessor(shards)
@@ -0,0 +1,105 @@
+# Local stand-in for user-service and inventory-service, for benchmarks
+#
+#   python3 inventory_stub.py --port 3003 --latency 20
+#   INVENTORY_SERVICE_URL=http://localhost:3003 USER_SERVICE_URL=http://localhost:3003 python3 app.py
+#
+# Serves GET /users/<id>, GET /inventory/<product_id> and (unless
+# --no-batch) POST /inventory/batch, each after --latency ms. Products
+# 1..PRODUCT_COUNT exist; any other id is "not found".
+import json
+import time
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PRODUCT_COUNT = 10000
+MAX_BATCH_ITEMS = 1000
+
+def make_handler(latency, batch=True):
+    def product(product_id):
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return None
+        if 1 <= product_id <= PRODUCT_COUNT:
+            return {"id": product_id, "name": f"Product {product_id}", "stock": 100, "price": 25.99}
+        return None
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes; avoid delayed-ACK stalls on keep-alive
+        disable_nagle_algorithm = True
+
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            parts = self.path.strip('/').split('/')
+            if len(parts) == 2 and parts[0] == 'users':
+                self.send_json({"id": parts[1], "name": "Stub user"})
+            elif len(parts) == 2 and parts[0] == 'inventory':
+                item = product(parts[1])
+                if item is None:
+                    self.send_json({"error": "Product not found"}, 404)
+                else:
+                    self.send_json(item)
+            else:
+                self.send_json({"error": "Not found"}, 404)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not batch or self.path != '/inventory/batch':
+                self.send_json({"error": "Not found"}, 404)
+                return
+            items = json.loads(body or b'{}').get('items')
+            if not isinstance(items, list):
+                self.send_json({"error": "items must be an array"}, 400)
+                return
+            if len(items) > MAX_BATCH_ITEMS:
+                self.send_json({"error": f"At most {MAX_BATCH_ITEMS} items per batch"}, 413)
+                return
+            time.sleep(latency)
+            results = []
+            for requested in items:
+                item = product(requested.get('product_id'))
+                if item is None:
+                    results.append({"product_id": requested.get('product_id'), "found": False, "available": False})
+                else:
+                    results.append({"product_id": requested.get('product_id'), "found": True, "stock": item['stock'],
+                                    "available": item['stock'] >= requested.get('quantity', 1)})
+            self.send_json({"items": results})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+class StubServer(ThreadingHTTPServer):
+    # Concurrent benchmarks open hundreds of connections at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+def serve(host='127.0.0.1', port=3003, latency=0.02, batch=True):
+    """Create (but do not start) a stub server"""
+    return StubServer((host, port), make_handler(latency, batch))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stub user/inventory service for order-service benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3003)
+    parser.add_argument('--latency', type=float, default=20, help='Milliseconds per request')
+    parser.add_argument('--no-batch', action='store_true', help='Do not serve POST /inventory/batch')
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency / 1000, not args.no_batch)
+    print(f"Stub inventory service on http://{args.host}:{args.port} (latency {args.latency}ms, "
+          f"batch {'off' if args.no_batch else 'on'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,109 @@
+# Prometheus exposition of order-service's own telemetry metrics
+#
+# Counters keep one value per label set under a lock, histograms keep
+# bucket counts, and gauges are callbacks read at scrape time. GET
+# /metrics on app.py and asgi_app.py renders every registered metric.
+# No prometheus_client needed.
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def expose(self):
+        return [('', labels, value) for labels, value in self.samples()]
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts = [0] * len(self.buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        with self._lock:
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def expose(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        samples, cumulative = [], 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            samples.append(('_bucket', (('le', bound),), cumulative))
+        return samples + [('_bucket', (('le', '+Inf'),), count), ('_sum', (), total), ('_count', (), count)]
+
+class Gauge:
+    def __init__(self, name, help, callback):
+        self.name = name
+        self.help = help
+        self._callback = callback
+
+    def samples(self):
+        """callback() returns a number, or a {label tuple: value} dict"""
+        value = self._callback()
+        if isinstance(value, dict):
+            return list(value.items())
+        return [((), value)]
+
+    def expose(self):
+        return [('', labels, value) for labels, value in self.samples()]
+
+def counter(name, help):
+    metric = Counter(name, help)
+    _registry.append(('counter', metric))
+    return metric
+
+def gauge(name, help, callback):
+    metric = Gauge(name, help, callback)
+    _registry.append(('gauge', metric))
+    return metric
+
+def histogram(name, help, buckets):
+    metric = Histogram(name, help, buckets)
+    _registry.append(('histogram', metric))
+    return metric
+
+def render():
+    """Prometheus text exposition of every registered metric"""
+    lines = []
+    for kind, metric in _registry:
+        lines += [f'# HELP {metric.name} {metric.help}', f'# TYPE {metric.name} {kind}']
+        for suffix, labels, value in metric.expose():
+            lines.append(f'{metric.name}{suffix}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,80 @@
+# Cursor pagination, filters and field projection for GET /orders
+#
+#   GET /orders?user_id=1&status=pending&fields=id,status,total&limit=100
+#   GET /orders?user_id=1&status=pending&cursor=<X-Next-Cursor of the previous page>
+#
+# Pages come from OrderRepository's indexes, so a request costs O(limit)
+# whatever the number of orders (a combined user_id+status filter has its
+# own index). limit defaults to ORDERS_PAGE_DEFAULT and is capped at
+# ORDERS_PAGE_MAX. The body stays a JSON array of orders; when more
+# follow, the X-Next-Cursor and Link rel="next" headers carry the cursor.
+# A cursor only marks a position, so repeat the filters with it (the Link
+# header does).
+import os
+import base64
+from urllib.parse import urlencode
+
+DEFAULT_LIMIT = int(os.getenv("ORDERS_PAGE_DEFAULT", "50"))
+MAX_LIMIT = int(os.getenv("ORDERS_PAGE_MAX", "500"))
+FIELDS = ('id', 'user_id', 'items', 'total', 'status')
+
+class QueryError(ValueError):
+    """A listing parameter the client has to fix (answered with 400)"""
+
+def encode_cursor(order_id):
+    return base64.urlsafe_b64encode(f"after:{order_id}".encode('ascii')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        kind, _, order_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii').partition(':')
+        if kind == 'after':
+            return int(order_id)
+    except ValueError:
+        pass
+    raise QueryError("Invalid cursor")
+
+def parse_query(args):
+    """Listing parameters from a query-string mapping; raises QueryError"""
+    limit = args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = min(int(limit), MAX_LIMIT)
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    if limit < 1:
+        raise QueryError("limit must be at least 1")
+
+    user_id = args.get('user_id')
+    if user_id is not None and user_id.lstrip('-').isdigit():
+        user_id = int(user_id)
+
+    fields = None
+    if args.get('fields'):
+        fields = [field for field in args['fields'].split(',') if field]
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise QueryError(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(FIELDS)})")
+
+    return {
+        "user_id": user_id,
+        "status": args.get('status'),
+        "after": decode_cursor(args['cursor']) if args.get('cursor') else 0,
+        "limit": limit,
+        "fields": fields,
+    }
+
+def list_orders(orders, query):
+    """One page of (projected) orders and the next page's cursor, or None on the last page"""
+    page, more = orders.page(query['user_id'], query['status'], query['after'], query['limit'])
+    cursor = encode_cursor(page[-1]['id']) if more else None
+    if query['fields']:
+        page = [{field: order[field] for field in query['fields']} for order in page]
+    return page, cursor
+
+def next_page_headers(path, args, cursor):
+    """X-Next-Cursor and Link headers for the page after this one"""
+    params = {name: value for name, value in args.items() if name != 'cursor'}
+    params['cursor'] = cursor
+    return {
+        "X-Next-Cursor": cursor,
+        "Link": f'<{path}?{urlencode(params)}>; rel="next"',
+    }
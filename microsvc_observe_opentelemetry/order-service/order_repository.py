@@ -0,0 +1,65 @@
+# In-process order storage with O(1) lookups and atomic ID allocation
+#
+# Orders live in a dict keyed by id, with secondary indexes by user_id,
+# by status and by (user_id, status). Each index is a list of order ids in
+# ascending order: ids only grow, so inserts are appends. A lock makes id allocation and
+# index updates atomic under concurrent requests.
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+
+def sample_orders():
+    """The demo orders each app starts with (fresh dicts every call)"""
+    return [
+        {"id": 1, "user_id": 1, "items": [{"product_id": 101, "quantity": 2}], "total": 99.98, "status": "completed"},
+        {"id": 2, "user_id": 2, "items": [{"product_id": 102, "quantity": 1}], "total": 49.99, "status": "pending"}
+    ]
+
+class OrderRepository:
+    def __init__(self, orders=()):
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._ids = []
+        self._by_user = defaultdict(list)
+        self._by_status = defaultdict(list)
+        self._by_user_status = defaultdict(list)
+        self._next_id = 1
+        for order in sorted(orders, key=lambda order: order['id']):
+            self._insert(order)
+            self._next_id = order['id'] + 1
+
+    def _insert(self, order):
+        self._orders[order['id']] = order
+        self._ids.append(order['id'])
+        self._by_user[order['user_id']].append(order['id'])
+        self._by_status[order['status']].append(order['id'])
+        self._by_user_status[order['user_id'], order['status']].append(order['id'])
+
+    def __len__(self):
+        return len(self._orders)
+
+    def create(self, user_id, items, total, status='pending'):
+        """Store a new order under the next free id and return it"""
+        with self._lock:
+            order = {"id": self._next_id, "user_id": user_id, "items": items, "total": total, "status": status}
+            self._next_id += 1
+            self._insert(order)
+        return order
+
+    def get(self, order_id):
+        return self._orders.get(order_id)
+
+    def page(self, user_id=None, status=None, after=0, limit=50):
+        """Up to limit matching orders with ids above after, oldest first, and whether more follow"""
+        with self._lock:
+            if user_id is None and status is None:
+                index = self._ids
+            elif status is None:
+                index = self._by_user.get(user_id, ())
+            elif user_id is None:
+                index = self._by_status.get(status, ())
+            else:
+                index = self._by_user_status.get((user_id, status), ())
+            start = bisect_right(index, after)
+            found = [self._orders[order_id] for order_id in index[start:start + limit]]
+            return found, start + limit < len(index)
@@ -0,0 +1,109 @@
+# Local stand-in for the OpenTelemetry collector's OTLP/HTTP trace receiver
+#
+#   python3 otlp_sink.py --port 4318 --latency 50
+#   OTEL_EXPORTER_OTLP_TRACES_ENDPOINT=http://localhost:4318/v1/traces python3 app.py
+#
+# Accepts POST /v1/traces (protobuf, optionally gzip or deflate encoded),
+# counts requests, spans and bytes, then discards them. Each answer comes
+# after --latency ms, and --status makes it play a failing collector.
+# GET /stats returns the counts as JSON.
+import gzip
+import json
+import zlib
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+    ExportTraceServiceRequest, ExportTraceServiceResponse
+)
+
+class SinkStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.spans = 0
+        self.wire_bytes = 0
+
+    def add(self, spans, wire_bytes):
+        with self._lock:
+            self.requests += 1
+            self.spans += spans
+            self.wire_bytes += wire_bytes
+
+    def snapshot(self):
+        with self._lock:
+            return {"requests": self.requests, "spans": self.spans, "wire_bytes": self.wire_bytes}
+
+def count_spans(body, encoding):
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    elif encoding == 'deflate':
+        body = zlib.decompress(body)
+    request = ExportTraceServiceRequest()
+    request.ParseFromString(body)
+    return sum(len(scope.spans) for resource in request.resource_spans for scope in resource.scope_spans)
+
+def make_handler(stats, latency=0.0, status=200, decode=True):
+    class SinkHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def send_body(self, body, content_type, status=200):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self.send_body(json.dumps(stats.snapshot()).encode('utf-8'), 'application/json')
+            else:
+                self.send_body(b'', 'text/plain', 404)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path != '/v1/traces':
+                self.send_body(b'', 'text/plain', 404)
+                return
+            time.sleep(latency)
+            if status != 200:
+                self.send_body(b'', 'text/plain', status)
+                return
+            stats.add(count_spans(body, self.headers.get('Content-Encoding')) if decode else 0, len(body))
+            self.send_body(ExportTraceServiceResponse().SerializeToString(), 'application/x-protobuf')
+
+        def log_message(self, format, *args):
+            pass
+
+    return SinkHandler
+
+class SinkServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+def serve(host='127.0.0.1', port=4318, latency=0.0, status=200, decode=True):
+    """Create (but do not start) a sink; its counts are in server.stats (no spans without decode)"""
+    stats = SinkStats()
+    server = SinkServer((host, port), make_handler(stats, latency, status, decode))
+    server.stats = stats
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stub OTLP/HTTP trace receiver for export benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--latency', type=float, default=0, help='Milliseconds per export request')
+    parser.add_argument('--status', type=int, default=200, help='HTTP status to answer exports with')
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency / 1000, args.status)
+    print(f"OTLP sink on http://{args.host}:{args.port}/v1/traces (latency {args.latency}ms, "
+          f"status {args.status})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats.snapshot()))
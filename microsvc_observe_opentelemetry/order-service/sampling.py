@@ -0,0 +1,157 @@
+# Head and tail trace sampling for order-service
+#
+# TRACE_SAMPLING picks the policy tracing.py installs:
+#   always  every request is traced and exported (the default)
+#   head    at most TRACE_SAMPLE_RATE requests per second start a trace in
+#           this service; the rest are never recorded. Spans inside a
+#           request follow its decision, and a caller that did not sample
+#           is respected.
+#   tail    every request is recorded; TailSamplingProcessor holds each
+#           trace's spans until its local root span ends, then exports the
+#           trace if any span failed or the root took TRACE_TAIL_SLOW_MS or
+#           more, and otherwise only within the TRACE_SAMPLE_RATE budget
+#   off     nothing is recorded
+#
+# Rates are per process. Every decision is counted in
+# order_service_trace_sampling_decisions_total (see metrics.py).
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF, ALWAYS_ON, Decision, ParentBased, Sampler, SamplingResult
+)
+
+import metrics
+
+TRACE_SAMPLING = os.getenv("TRACE_SAMPLING", "always")
+# Traces per second kept by the head sampler, and by the tail sampler besides errors and slow requests
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "10"))
+TRACE_TAIL_SLOW_MS = float(os.getenv("TRACE_TAIL_SLOW_MS", "500"))
+# Traces held by the tail sampler at once; the oldest is decided early beyond this
+TRACE_TAIL_MAX_TRACES = int(os.getenv("TRACE_TAIL_MAX_TRACES", "10000"))
+
+DECISIONS = metrics.counter('order_service_trace_sampling_decisions_total',
+                            'Sampling decisions by sampler, decision and reason')
+
+class RateLimiter:
+    """Token bucket: rate tokens per second, up to burst banked"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+class RateLimitingSampler(Sampler):
+    """Sample while the limiter has budget, drop the rest"""
+
+    def __init__(self, limiter):
+        self._limiter = limiter
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None,
+                      trace_state=None):
+        if self._limiter.try_acquire():
+            DECISIONS.inc(sampler='head', decision='sampled', reason='rate')
+            decision = Decision.RECORD_AND_SAMPLE
+        else:
+            DECISIONS.inc(sampler='head', decision='dropped', reason='rate')
+            decision = Decision.DROP
+        parent_state = trace.get_current_span(parent_context).get_span_context().trace_state
+        return SamplingResult(decision, attributes if decision.is_sampled() else None, parent_state)
+
+    def get_description(self):
+        return f"RateLimitingSampler{{{self._limiter.rate}/s}}"
+
+class TailSamplingProcessor(SpanProcessor):
+    """Buffer spans per trace and forward whole traces worth keeping to delegate"""
+
+    def __init__(self, delegate, limiter, slow_ms=TRACE_TAIL_SLOW_MS, max_traces=TRACE_TAIL_MAX_TRACES):
+        self._delegate = delegate
+        self._limiter = limiter
+        self._slow_ns = slow_ms * 1_000_000
+        self._max_traces = max_traces
+        self._lock = threading.Lock()
+        self._traces = OrderedDict()
+
+    def __len__(self):
+        return len(self._traces)
+
+    def on_start(self, span, parent_context=None):
+        self._delegate.on_start(span, parent_context)
+
+    def on_end(self, span):
+        # The local root is the request's server span: no parent, or a parent in the caller
+        local_root = span.parent is None or span.parent.is_remote
+        evicted = None
+        with self._lock:
+            spans = self._traces.pop(span.context.trace_id, [])
+            spans.append(span)
+            if not local_root:
+                self._traces[span.context.trace_id] = spans
+                if len(self._traces) > self._max_traces:
+                    evicted = self._traces.popitem(last=False)[1]
+        if local_root:
+            self._decide(spans, span)
+        elif evicted:
+            self._decide(evicted, None)
+
+    def _decide(self, spans, root):
+        """Keep failed or slow traces, and others while the rate budget lasts"""
+        if any(span.status.status_code is trace.StatusCode.ERROR for span in spans):
+            reason = 'error'
+        elif root is not None and root.end_time - root.start_time >= self._slow_ns:
+            reason = 'slow'
+        elif root is None:
+            # Root never ended within the buffer; keep only what is clearly interesting
+            DECISIONS.inc(sampler='tail', decision='dropped', reason='evicted')
+            return
+        elif self._limiter.try_acquire():
+            reason = 'rate'
+        else:
+            DECISIONS.inc(sampler='tail', decision='dropped', reason='rate')
+            return
+        DECISIONS.inc(sampler='tail', decision='sampled', reason=reason)
+        for span in spans:
+            self._delegate.on_end(span)
+
+    def shutdown(self):
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis=30000):
+        return self._delegate.force_flush(timeout_millis)
+
+def make_sampler(policy=None):
+    policy = policy or TRACE_SAMPLING
+    if policy == 'head':
+        head = RateLimitingSampler(RateLimiter(TRACE_SAMPLE_RATE))
+        # A caller's sampled flag does not bypass this service's budget; its "not sampled" does
+        return ParentBased(root=head, remote_parent_sampled=head)
+    if policy == 'off':
+        return ALWAYS_OFF
+    if policy in ('always', 'tail'):
+        return ParentBased(root=ALWAYS_ON)
+    raise ValueError(f"TRACE_SAMPLING must be always, head, tail or off, not {policy!r}")
+
+def make_processor(delegate, policy=None):
+    """The span processor to install in front of the exporting delegate"""
+    if (policy or TRACE_SAMPLING) != 'tail':
+        return delegate
+    processor = TailSamplingProcessor(delegate, RateLimiter(TRACE_SAMPLE_RATE))
+    metrics.gauge('order_service_tail_sampler_buffered_traces',
+                  'Traces waiting for their root span to end', lambda: len(processor))
+    return processor
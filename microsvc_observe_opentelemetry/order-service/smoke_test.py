@@ -0,0 +1,74 @@
+# Smoke test: the same requests against the Flask app and the ASGI app
+#
+#   python3 smoke_test.py
+#
+# Starts inventory_stub.py in-process and sends every route of the API to
+# app.py (Flask test client) and asgi_app.py (httpx's ASGI transport), so a
+# change that breaks one serving mode fails here. Exits non-zero on any
+# unexpected response. Tracing is off (TRACE_SAMPLING=off), so no spans
+# are recorded or exported.
+import os
+import sys
+import asyncio
+import threading
+
+import inventory_stub
+
+ORDER = {"user_id": 1, "items": [{"product_id": 1, "quantity": 2}]}
+
+# method, path, JSON body, expected status, header that must be present
+CHECKS = [
+    ('GET', '/health', None, 200, None),
+    ('GET', '/metrics', None, 200, None),
+    ('GET', '/orders', None, 200, None),
+    ('GET', '/orders?limit=1', None, 200, 'X-Next-Cursor'),
+    ('GET', '/orders?user_id=1&status=completed&fields=id,status', None, 200, None),
+    ('GET', '/orders?cursor=not-a-cursor', None, 400, None),
+    ('GET', '/orders/1', None, 200, None),
+    ('GET', '/orders/999999', None, 404, None),
+    ('POST', '/orders', ORDER, 201, None),
+    ('POST', '/orders', {"user_id": 1, "items": [{"product_id": 999999, "quantity": 1}]}, 400, None),
+]
+
+def check(mode, method, path, status, header, response_status, response_headers):
+    ok = response_status == status and (header is None or header in response_headers)
+    print(f"{'ok  ' if ok else 'FAIL'} {mode:5} {method:4} {path} -> {response_status}")
+    return ok
+
+def smoke_flask(app):
+    client = app.app.test_client()
+    results = []
+    for method, path, body, status, header in CHECKS:
+        response = client.open(path, method=method, json=body)
+        results.append(check('flask', method, path, status, header, response.status_code, response.headers))
+    return all(results)
+
+async def smoke_asgi(asgi_app):
+    import httpx
+    import downstream_async
+    results = []
+    transport = httpx.ASGITransport(app=asgi_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://order-service') as client:
+        for method, path, body, status, header in CHECKS:
+            response = await client.request(method, path, json=body)
+            results.append(check('asgi', method, path, status, header, response.status_code, response.headers))
+    await downstream_async.aclose()
+    return all(results)
+
+def main():
+    server = inventory_stub.serve(port=0, latency=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT', 'http://127.0.0.1:9/v1/traces')
+    os.environ['TRACE_SAMPLING'] = 'off'
+    os.environ['USER_SERVICE_URL'] = url
+    os.environ['INVENTORY_SERVICE_URL'] = url
+    import app
+    import asgi_app
+
+    flask_ok = smoke_flask(app)
+    asgi_ok = asyncio.run(smoke_asgi(asgi_app))
+    return 0 if flask_ok and asgi_ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+# OpenTelemetry setup shared by order-service's Flask (app.py) and ASGI (asgi_app.py) apps
+#
+# Importing this module installs the global TracerProvider and its OTLP
+# export pipeline once, whichever app is served. The sampler and the tail
+# sampling processor come from sampling.py (TRACE_SAMPLING), the batching
+# and exporter settings from export_pipeline.py.
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.resources import Resource
+
+import sampling
+import export_pipeline
+
+# Configure OpenTelemetry
+resource = Resource.create({
+    "service.name": "order-service",
+    "service.version": "1.0.0"
+})
+
+trace.set_tracer_provider(TracerProvider(resource=resource, sampler=sampling.make_sampler()))
+
+# Configure OTLP export (OTEL_EXPORTER_OTLP_TRACES_ENDPOINT, OTEL_BSP_*, TRACE_EXPORT_CONCURRENCY)
+span_processor = sampling.make_processor(export_pipeline.make_processor())
+trace.get_tracer_provider().add_span_processor(span_processor)
@@ -0,0 +1,128 @@
+# Columnar, array-backed span store for the trace analyzer
+#
+# Spans are flattened into one row each; service and operation names are
+# interned as integer codes, parents are resolved to row numbers, and the
+# analyses in analyze-traces.py become NumPy queries over the columns.
+from array import array
+
+import numpy as np
+
+from trace_files import parent_span_id, span_has_error
+
+def _span_id(value):
+    """Span IDs are 64-bit hex strings in Jaeger and OTLP exports"""
+    try:
+        return int(value, 16) & 0xFFFFFFFFFFFFFFFF
+    except (TypeError, ValueError):
+        return hash(value) & 0xFFFFFFFFFFFFFFFF
+
+class SpanStore:
+    """Spans of many traces, one NumPy column per field.
+
+    Columns: trace (trace code), span_id, parent (row of the parent span
+    in the same trace, or -1), service and operation (codes), start and
+    duration (microseconds), error (bool). trace_ids, services and
+    operations map codes back to names; traces are coded in first-seen order.
+    """
+
+    def __init__(self):
+        self.trace_ids = []
+        self.services = []
+        self.operations = []
+        self._trace_codes = {}
+        self._service_codes = {}
+        self._operation_codes = {}
+        self._columns = {
+            'trace': array('i'), 'span_id': array('Q'), 'parent': array('q'),
+            'service': array('i'), 'operation': array('i'),
+            'start': array('q'), 'duration': array('q'), 'error': array('b'),
+        }
+        self._roots = None
+
+    @classmethod
+    def from_traces(cls, traces):
+        store = cls()
+        for trace in traces:
+            store.add_trace(trace)
+        return store.freeze()
+
+    @staticmethod
+    def _intern(codes, names, name):
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def add_trace(self, trace):
+        """Append the spans of one Jaeger-shaped trace"""
+        spans = trace.get('spans')
+        if not spans:
+            return
+        columns = self._columns
+        trace_code = self._intern(self._trace_codes, self.trace_ids, trace.get('traceID'))
+        first_row = len(columns['trace'])
+        rows = {span.get('spanID'): first_row + i for i, span in enumerate(spans)}
+        for span in spans:
+            service = span.get('process', {}).get('serviceName', 'unknown')
+            columns['trace'].append(trace_code)
+            columns['span_id'].append(_span_id(span.get('spanID')))
+            columns['parent'].append(rows.get(parent_span_id(span), -1))
+            columns['service'].append(self._intern(self._service_codes, self.services, service))
+            columns['operation'].append(self._intern(self._operation_codes, self.operations,
+                                                     span.get('operationName', 'unknown')))
+            columns['start'].append(span['startTime'])
+            columns['duration'].append(span.get('duration', 0))
+            columns['error'].append(span_has_error(span))
+
+    def freeze(self):
+        """Expose the columns as NumPy arrays (zero-copy views of the buffers)"""
+        dtypes = {'trace': np.int32, 'span_id': np.uint64, 'parent': np.int64, 'service': np.int32,
+                  'operation': np.int32, 'start': np.int64, 'duration': np.int64, 'error': np.bool_}
+        for name, column in self._columns.items():
+            setattr(self, name, np.frombuffer(column, dtype=dtypes[name]) if len(column)
+                    else np.empty(0, dtype=dtypes[name]))
+        self._roots = None
+        return self
+
+    def __len__(self):
+        return len(self.trace)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self._columns)
+
+    def roots(self):
+        """Row of each trace's root span (earliest start; first listed on ties), by trace code"""
+        if self._roots is None:
+            order = np.lexsort((self.start, self.trace))
+            sorted_traces = self.trace[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = sorted_traces[1:] != sorted_traces[:-1]
+            self._roots = np.full(len(self.trace_ids), -1, dtype=np.int64)
+            self._roots[sorted_traces[first]] = order[first]
+        return self._roots
+
+    def traces_with_service(self, service_name, limit=None):
+        """Codes of the first limit traces with a span from service_name"""
+        code = self._service_codes.get(service_name)
+        if code is None:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(self.trace[self.service == code])[:limit]
+
+    def first_traces(self, limit=None):
+        count = len(self.trace_ids) if limit is None else min(limit, len(self.trace_ids))
+        return np.arange(count, dtype=np.int32)
+
+    def slow_roots(self, threshold_us, limit=None):
+        """Root rows of the first limit traces longer than threshold_us, slowest first"""
+        roots = self.roots()[self.first_traces(limit)]
+        slow = roots[self.duration[roots] > threshold_us]
+        return slow[np.argsort(-self.duration[slow], kind='stable')]
+
+    def first_error_spans(self, limit=None):
+        """Row of the first error span of each trace among the first limit traces"""
+        error = self.error if limit is None else self.error & (self.trace < limit)
+        rows = np.flatnonzero(error)
+        _, first = np.unique(self.trace[rows], return_index=True)
+        return rows[first]
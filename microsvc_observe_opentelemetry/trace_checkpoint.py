@@ -0,0 +1,134 @@
+# Checkpointed, rolling-window state for incremental trace analysis
+#
+# A Checkpoint remembers the newest trace start already folded in (the
+# watermark) plus the IDs of traces near it, so the next run only fetches
+# traces from the watermark on and skips the ones it has seen. Aggregates
+# live in per-minute buckets of counts and mergeable latency sketches:
+# adding a trace touches one bucket, and buckets older than the window
+# are dropped, so each run costs O(new traces), not O(window).
+import json
+import os
+from collections import defaultdict
+
+from latency_sketch import LatencySketches
+from trace_files import span_has_error, trace_start
+
+BUCKET_SECONDS = 60
+# Re-query this far behind the watermark to pick up late-arriving traces
+OVERLAP_SECONDS = 60
+
+class WindowBucket:
+    def __init__(self):
+        self.traces = 0
+        self.errors = 0
+        self.slow = 0
+        self.service_errors = defaultdict(int)
+        self.sketches = LatencySketches()
+
+    def to_dict(self):
+        return {'traces': self.traces, 'errors': self.errors, 'slow': self.slow,
+                'service_errors': self.service_errors, 'sketches': self.sketches.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        bucket = cls()
+        bucket.traces, bucket.errors, bucket.slow = data['traces'], data['errors'], data['slow']
+        bucket.service_errors.update(data.get('service_errors', {}))
+        bucket.sketches = LatencySketches.from_dict(data['sketches'])
+        return bucket
+
+class Checkpoint:
+    """Watermark, recently seen trace IDs and per-minute aggregates of one window"""
+
+    def __init__(self, path, window_seconds, slow_threshold_ms=1000):
+        # path None keeps the checkpoint in memory only
+        self.path = path
+        self.window = window_seconds * 1_000_000
+        self.slow_threshold = slow_threshold_ms * 1000
+        self.watermark = None
+        self.seen = {}
+        self.buckets = {}
+
+    @classmethod
+    def load(cls, path, window_seconds, slow_threshold_ms=1000):
+        checkpoint = cls(path, window_seconds, slow_threshold_ms)
+        if path is not None and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            checkpoint.watermark = data['watermark']
+            checkpoint.seen = data['seen']
+            checkpoint.buckets = {int(start): WindowBucket.from_dict(bucket)
+                                  for start, bucket in data['buckets'].items()}
+        return checkpoint
+
+    def save(self):
+        """Write the checkpoint atomically, so an interrupted run keeps the previous one"""
+        if self.path is None:
+            return
+        data = {'watermark': self.watermark, 'seen': self.seen,
+                'buckets': {str(start): bucket.to_dict() for start, bucket in self.buckets.items()}}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def since(self, now):
+        """Start (microseconds) of the next query"""
+        if self.watermark is None:
+            return now - self.window
+        return self.watermark - OVERLAP_SECONDS * 1_000_000
+
+    def add_traces(self, traces):
+        """Fold in traces not seen before; returns how many were new"""
+        added = 0
+        for trace in traces:
+            trace_id = trace.get('traceID')
+            if not trace.get('spans') or trace_id in self.seen:
+                continue
+            start = trace_start(trace)
+            self.seen[trace_id] = start
+            bucket_start = start - start % (BUCKET_SECONDS * 1_000_000)
+            bucket = self.buckets.get(bucket_start)
+            if bucket is None:
+                bucket = self.buckets[bucket_start] = WindowBucket()
+            bucket.traces += 1
+            has_error = False
+            for span in trace['spans']:
+                if span_has_error(span):
+                    bucket.service_errors[span.get('process', {}).get('serviceName', 'unknown')] += 1
+                    has_error = True
+            bucket.errors += has_error
+            root = min(trace['spans'], key=lambda span: span['startTime'])
+            bucket.slow += root.get('duration', 0) > self.slow_threshold
+            bucket.sketches.record_trace(trace)
+            self.watermark = start if self.watermark is None else max(self.watermark, start)
+            added += 1
+        return added
+
+    def expire(self, now):
+        """Drop buckets that left the window and IDs the next query can no longer return"""
+        oldest = now - self.window
+        for bucket_start in [start for start in self.buckets if start + BUCKET_SECONDS * 1_000_000 <= oldest]:
+            del self.buckets[bucket_start]
+        if self.watermark is not None:
+            horizon = self.watermark - OVERLAP_SECONDS * 1_000_000
+            self.seen = {trace_id: start for trace_id, start in self.seen.items() if start >= horizon}
+
+    def totals(self):
+        """(traces, errors, slow traces, merged sketches) over the window"""
+        sketches = LatencySketches()
+        traces = errors = slow = 0
+        for bucket in self.buckets.values():
+            traces += bucket.traces
+            errors += bucket.errors
+            slow += bucket.slow
+            sketches.merge(bucket.sketches)
+        return traces, errors, slow, sketches
+
+    def service_errors(self):
+        """Error spans per service over the window"""
+        errors = defaultdict(int)
+        for bucket in self.buckets.values():
+            for service, count in bucket.service_errors.items():
+                errors[service] += count
+        return errors
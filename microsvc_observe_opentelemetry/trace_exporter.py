@@ -0,0 +1,147 @@
+# Prometheus exposition of analyzer-derived trace metrics
+#
+#   python3 analyze-traces.py --serve-metrics 9464
+#
+# A background thread refreshes a rolling-window Checkpoint (see
+# trace_checkpoint.py) every REFRESH_INTERVAL seconds and renders the
+# whole /metrics payload once; scrapes only return the latest rendering,
+# so they are O(1) and never query Jaeger. A failed refresh re-renders the
+# last window with the updated error counter, so a stale exporter shows up
+# in trace_analyzer_refresh_errors_total and the last refresh timestamp.
+# No prometheus_client needed.
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from latency_sketch import QUANTILES
+
+REFRESH_INTERVAL = 15
+# Histogram bucket bounds, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def render_metrics(checkpoint, refresh_stats):
+    """Prometheus text exposition of a checkpoint's window (only the refresh stats without one)"""
+    lines = _window_lines(checkpoint) if checkpoint is not None else []
+    lines += [
+        '# HELP trace_analyzer_last_refresh_timestamp_seconds End of the last successful refresh',
+        '# TYPE trace_analyzer_last_refresh_timestamp_seconds gauge',
+        f'trace_analyzer_last_refresh_timestamp_seconds {refresh_stats["last_refresh"]}',
+        '# HELP trace_analyzer_refresh_duration_seconds Duration of the last refresh',
+        '# TYPE trace_analyzer_refresh_duration_seconds gauge',
+        f'trace_analyzer_refresh_duration_seconds {refresh_stats["duration"]}',
+        '# HELP trace_analyzer_refresh_errors_total Failed refreshes',
+        '# TYPE trace_analyzer_refresh_errors_total counter',
+        f'trace_analyzer_refresh_errors_total {refresh_stats["errors"]}',
+    ]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+def _window_lines(checkpoint):
+    traces, errors, slow, sketches = checkpoint.totals()
+    service_errors = checkpoint.service_errors()
+    lines = [
+        '# HELP trace_analyzer_window_traces Traces in the rolling window',
+        '# TYPE trace_analyzer_window_traces gauge',
+        f'trace_analyzer_window_traces {traces}',
+        '# HELP trace_analyzer_window_error_traces Traces with at least one error span in the window',
+        '# TYPE trace_analyzer_window_error_traces gauge',
+        f'trace_analyzer_window_error_traces {errors}',
+        '# HELP trace_analyzer_window_slow_traces Traces whose root span exceeded the slow threshold',
+        '# TYPE trace_analyzer_window_slow_traces gauge',
+        f'trace_analyzer_window_slow_traces{_labels(threshold_ms=checkpoint.slow_threshold // 1000)} {slow}',
+        '# HELP trace_analyzer_error_ratio Error spans / spans per service in the window',
+        '# TYPE trace_analyzer_error_ratio gauge',
+    ]
+    for service in sketches.services():
+        spans = sketches.sketch(service).count
+        lines.append(f'trace_analyzer_error_ratio{_labels(service=service)} '
+                     f'{service_errors.get(service, 0) / spans if spans else 0}')
+
+    lines += ['# HELP trace_analyzer_span_duration_seconds Span durations in the window',
+              '# TYPE trace_analyzer_span_duration_seconds histogram']
+    quantile_lines = ['# HELP trace_analyzer_span_duration_quantile_seconds Span duration quantiles '
+                      '(1% relative accuracy)',
+                      '# TYPE trace_analyzer_span_duration_quantile_seconds gauge']
+    for service in sketches.services():
+        for operation in sketches.operations(service):
+            sketch = sketches.sketch(service, operation)
+            for bound in LATENCY_BUCKETS:
+                lines.append(f'trace_analyzer_span_duration_seconds_bucket'
+                             f'{_labels(service=service, operation=operation, le=bound)} '
+                             f'{sketch.count_at_most(bound * 1_000_000)}')
+            labels = _labels(service=service, operation=operation)
+            lines.append(f'trace_analyzer_span_duration_seconds_bucket'
+                         f'{_labels(service=service, operation=operation, le="+Inf")} {sketch.count}')
+            lines.append(f'trace_analyzer_span_duration_seconds_sum{labels} {sketch.total / 1_000_000}')
+            lines.append(f'trace_analyzer_span_duration_seconds_count{labels} {sketch.count}')
+            for q in QUANTILES:
+                quantile_lines.append(f'trace_analyzer_span_duration_quantile_seconds'
+                                      f'{_labels(service=service, operation=operation, quantile=q)} '
+                                      f'{sketch.quantile(q) / 1_000_000}')
+    return lines + quantile_lines
+
+class MetricsExporter:
+    """Runs refresh() on a background loop and keeps the rendered payload
+
+    Call refresh_once() before start() so the first scrape has data;
+    the loop then refreshes every interval seconds.
+    """
+
+    def __init__(self, refresh, interval=REFRESH_INTERVAL):
+        self.refresh = refresh
+        self.interval = interval
+        self.checkpoint = None
+        self.stats = {'last_refresh': 0, 'duration': 0, 'errors': 0}
+        self.payload = render_metrics(None, self.stats)
+        self._stop = threading.Event()
+
+    def refresh_once(self):
+        start = time.monotonic()
+        try:
+            self.checkpoint = self.refresh()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️  Refresh failed: {e}")
+        else:
+            self.stats['duration'] = time.monotonic() - start
+            self.stats['last_refresh'] = time.time()
+        # A single reference swap: scrapes see either the old or the new payload
+        self.payload = render_metrics(self.checkpoint, self.stats)
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh_once()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+def make_handler(exporter):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = exporter.payload
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+def serve(exporter, host='0.0.0.0', port=9464):
+    """Create (but do not start) the /metrics server"""
+    return ThreadingHTTPServer((host, port), make_handler(exporter))
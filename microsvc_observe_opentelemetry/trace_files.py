@@ -0,0 +1,195 @@
+# Read exported traces from disk, in the shape returned by Jaeger's /api/traces
+#
+# Supported inputs (optionally gzip-compressed, by .gz suffix):
+#   - Jaeger API / UI exports: {"data": [trace, ...]}
+#   - JSON lines: one Jaeger trace per line
+#   - OTLP JSON exports: {"resourceSpans": [...]} (one object per file or per line)
+#
+# OTLP exporters write spans in batches, so one trace is usually spread over
+# several lines (or files). OTLP spans are grouped by traceId across lines
+# and files while at most OTLP_OPEN_TRACES traces are open; beyond that the
+# trace that went longest without a new span is emitted. Spans arriving
+# after their trace was emitted come out as a second, partial trace.
+import gzip
+import json
+import random
+from collections import OrderedDict, defaultdict
+
+try:
+    import ijson  # optional: streams large {"data": [...]} files instead of loading them
+except ImportError:
+    ijson = None
+
+JSONL_SUFFIXES = ('.jsonl', '.jsonl.gz', '.ndjson', '.ndjson.gz')
+# OTLP traces held open while their spans may still follow
+OTLP_OPEN_TRACES = 10000
+
+def open_trace_file(path, binary=False):
+    """Open a trace file, transparently decompressing .gz files"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb') if binary else gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'rb') if binary else open(path, 'r', encoding='utf-8')
+
+def normalize_trace(trace):
+    """Inline span processes, as the analyzer reads span['process']"""
+    processes = trace.get('processes', {})
+    for span in trace.get('spans', []):
+        if 'process' not in span and span.get('processID') in processes:
+            span['process'] = processes[span['processID']]
+    return trace
+
+def _attributes_to_tags(attributes):
+    tags = []
+    for attribute in attributes or []:
+        value = attribute.get('value', {})
+        tags.append({'key': attribute.get('key'), 'value': next(iter(value.values()), None)})
+    return tags
+
+def otlp_spans(document):
+    """Convert the spans of an OTLP JSON export into Jaeger-shaped spans"""
+    for resource_spans in document.get('resourceSpans', []):
+        resource_tags = _attributes_to_tags(resource_spans.get('resource', {}).get('attributes'))
+        service = next((tag['value'] for tag in resource_tags if tag['key'] == 'service.name'), 'unknown')
+        process = {'serviceName': service, 'tags': resource_tags}
+        for scope_spans in resource_spans.get('scopeSpans', resource_spans.get('instrumentationLibrarySpans', [])):
+            for otlp_span in scope_spans.get('spans', []):
+                start = int(otlp_span.get('startTimeUnixNano', 0))
+                end = int(otlp_span.get('endTimeUnixNano', start))
+                tags = _attributes_to_tags(otlp_span.get('attributes'))
+                if otlp_span.get('status', {}).get('code') in (2, 'STATUS_CODE_ERROR'):
+                    tags.append({'key': 'error', 'value': True})
+                span = {
+                    'traceID': otlp_span['traceId'],
+                    'spanID': otlp_span['spanId'],
+                    'operationName': otlp_span.get('name', 'unknown'),
+                    'startTime': start // 1000,
+                    'duration': (end - start) // 1000,
+                    'tags': tags,
+                    'process': process,
+                    'references': [],
+                }
+                if otlp_span.get('parentSpanId'):
+                    span['references'].append({'refType': 'CHILD_OF', 'traceID': otlp_span['traceId'],
+                                               'spanID': otlp_span['parentSpanId']})
+                yield span
+
+def otlp_to_traces(document):
+    """Convert an OTLP JSON export into Jaeger-shaped traces"""
+    traces = defaultdict(list)
+    for span in otlp_spans(document):
+        traces[span['traceID']].append(span)
+    for trace_id, spans in traces.items():
+        yield {'traceID': trace_id, 'spans': spans}
+
+class OtlpTraceBuffer:
+    """Group OTLP spans into traces across documents, with at most max_open traces open"""
+
+    def __init__(self, max_open=OTLP_OPEN_TRACES):
+        self.max_open = max_open
+        self.open = OrderedDict()
+
+    def add(self, document):
+        """Add a document's spans; yields the traces evicted to stay within max_open"""
+        for span in otlp_spans(document):
+            spans = self.open.get(span['traceID'])
+            if spans is None:
+                spans = self.open[span['traceID']] = []
+            else:
+                self.open.move_to_end(span['traceID'])
+            spans.append(span)
+        while len(self.open) > self.max_open:
+            yield self._pop()
+
+    def flush(self):
+        """Yield every open trace"""
+        while self.open:
+            yield self._pop()
+
+    def _pop(self):
+        trace_id, spans = self.open.popitem(last=False)
+        return {'traceID': trace_id, 'spans': spans}
+
+def _document_traces(document, otlp):
+    if 'resourceSpans' in document:
+        yield from otlp.add(document)
+    elif 'data' in document:
+        for trace in document['data']:
+            yield normalize_trace(trace)
+    elif 'spans' in document:
+        yield normalize_trace(document)
+
+def _iter_file(path, otlp):
+    if path.endswith(JSONL_SUFFIXES):
+        with open_trace_file(path) as f:
+            for line in f:
+                if line.strip():
+                    yield from _document_traces(json.loads(line), otlp)
+        return
+    if ijson is not None:
+        # Stream the "data" array of Jaeger exports instead of loading the whole file
+        found = False
+        with open_trace_file(path, binary=True) as f:
+            for trace in ijson.items(f, 'data.item', use_float=True):
+                found = True
+                yield normalize_trace(trace)
+        if found:
+            return
+    with open_trace_file(path) as f:
+        yield from _document_traces(json.load(f), otlp)
+
+def span_has_error(span):
+    return any(tag.get('key') == 'error' and tag.get('value') == True for tag in span.get('tags', []))
+
+def trace_start(trace):
+    """Earliest span start of a trace, in microseconds"""
+    return min((span.get('startTime', 0) for span in trace.get('spans', [])), default=0)
+
+def parent_span_id(span):
+    """spanID of the span's CHILD_OF parent, or None for a root span"""
+    for reference in span.get('references', []):
+        if reference.get('refType', 'CHILD_OF') == 'CHILD_OF':
+            return reference.get('spanID')
+    return None
+
+def trace_services(trace):
+    return {span.get('process', {}).get('serviceName') for span in trace.get('spans', [])}
+
+def iter_traces(paths, service_name=None, max_open=OTLP_OPEN_TRACES):
+    """Stream traces from files, optionally only those touching service_name
+
+    OTLP spans are merged by traceId across all the files, keeping at
+    most max_open traces open (see the top of this module).
+    """
+    otlp = OtlpTraceBuffer(max_open)
+    for path in paths:
+        for trace in _iter_file(path, otlp):
+            if service_name is None or service_name in trace_services(trace):
+                yield trace
+    for trace in otlp.flush():
+        if service_name is None or service_name in trace_services(trace):
+            yield trace
+
+def write_synthetic_traces(path, count, services, seed=42, error_rate=0.05):
+    """Write count synthetic traces as JSON lines, for benchmarks"""
+    rng = random.Random(seed)
+    operations = ['GET /api/users', 'GET /api/orders', 'POST /api/orders', 'GET /api/inventory']
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            trace_id = f"{rng.getrandbits(128):032x}"
+            start = 1_700_000_000_000_000 + i * 1000
+            root_duration = int(rng.lognormvariate(11, 0.8))
+            spans = [{
+                'traceID': trace_id, 'spanID': f"{rng.getrandbits(64):016x}",
+                'operationName': rng.choice(operations), 'startTime': start, 'duration': root_duration,
+                'process': {'serviceName': services[0]}, 'tags': [], 'references': [],
+            }]
+            for service in services[1:rng.randint(2, len(services))]:
+                duration = rng.randint(1, max(1, root_duration // 2))
+                spans.append({
+                    'traceID': trace_id, 'spanID': f"{rng.getrandbits(64):016x}",
+                    'operationName': f"{service} handler", 'startTime': start + rng.randint(0, root_duration - duration),
+                    'duration': duration, 'process': {'serviceName': service},
+                    'tags': [{'key': 'error', 'value': True}] if rng.random() < error_rate else [],
+                    'references': [{'refType': 'CHILD_OF', 'traceID': trace_id, 'spanID': spans[0]['spanID']}],
+                })
+            f.write(json.dumps({'traceID': trace_id, 'spans': spans}) + '\n')
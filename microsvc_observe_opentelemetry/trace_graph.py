@@ -0,0 +1,110 @@
+# Span trees, critical paths and self time for Jaeger-shaped traces
+#
+# build_trace_graph() links spans to their CHILD_OF parents in one pass
+# (O(n) per trace). critical_path() then walks back from the root's end,
+# always following the child that finished last before the cursor, which
+# is the chain of work the request actually waited on. Self time is a
+# span's duration minus the time covered by its children.
+from collections import defaultdict
+
+from trace_files import parent_span_id
+
+class SpanNode:
+    __slots__ = ('span', 'start', 'end', 'children')
+
+    def __init__(self, span):
+        self.span = span
+        self.start = span['startTime']
+        self.end = self.start + span.get('duration', 0)
+        self.children = []
+
+    @property
+    def key(self):
+        return (self.span.get('process', {}).get('serviceName', 'unknown'), self.span.get('operationName', 'unknown'))
+
+class TraceGraph:
+    def __init__(self, root, nodes):
+        self.root = root
+        self.nodes = nodes
+
+def build_trace_graph(trace):
+    """Link a trace's spans into a tree; returns None for a trace without spans"""
+    spans = trace.get('spans') or []
+    nodes = {span.get('spanID'): SpanNode(span) for span in spans}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(parent_span_id(node.span))
+        if parent is None or parent is node:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    if not roots:
+        return None
+    # Several parentless spans (missing parents): the earliest is the trace root
+    root = min(roots, key=lambda node: node.start)
+    return TraceGraph(root, list(nodes.values()))
+
+def self_time(node):
+    """Duration of node not covered by any child (children clipped to the node)"""
+    covered = 0
+    cursor = node.start
+    for child in sorted(node.children, key=lambda child: child.start):
+        start, end = max(child.start, cursor), min(child.end, node.end)
+        if end > start:
+            covered += end - start
+            cursor = end
+    return node.end - node.start - covered
+
+def critical_path(graph):
+    """Microseconds each node spends on the trace's critical path, as {node: time}"""
+    contributions = defaultdict(int)
+    visited = set()
+    stack = [(graph.root, graph.root.end)]
+    while stack:
+        node, end = stack.pop()
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        cursor = min(node.end, end)
+        for child in sorted(node.children, key=lambda child: child.end, reverse=True):
+            if child.start >= cursor:
+                continue
+            child_end = min(child.end, cursor)
+            if child_end <= node.start:
+                break
+            contributions[node] += cursor - child_end
+            stack.append((child, child_end))
+            cursor = max(child.start, node.start)
+            if cursor <= node.start:
+                break
+        if cursor > node.start:
+            contributions[node] += cursor - node.start
+    return contributions
+
+class CriticalPathStats:
+    """Critical-path time per contributing (service, operation), grouped by root operation"""
+
+    def __init__(self):
+        self.traces = defaultdict(int)
+        self.path_time = defaultdict(lambda: defaultdict(int))
+        self.self_time = defaultdict(int)
+        self.spans = defaultdict(int)
+
+    def add_trace(self, trace):
+        graph = build_trace_graph(trace)
+        if graph is None:
+            return
+        root = graph.root.key
+        self.traces[root] += 1
+        for node, time in critical_path(graph).items():
+            self.path_time[root][node.key] += time
+        for node in graph.nodes:
+            self.self_time[node.key] += self_time(node)
+            self.spans[node.key] += 1
+
+    def top_contributors(self, root, count=5):
+        """[(key, share of the root's critical path, average us per trace)], biggest first"""
+        contributions = self.path_time[root]
+        total = sum(contributions.values()) or 1
+        top = sorted(contributions.items(), key=lambda item: item[1], reverse=True)[:count]
+        return [(key, time / total, time / self.traces[root]) for key, time in top]
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+import importlib.util
+
+# Load integrity-checker.py (hyphenated name, not importable directly)
+spec = importlib.util.spec_from_file_location(
+    'integrity_checker', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'integrity-checker.py'))
+checker = importlib.util.module_from_spec(spec)
+sys.modules['integrity_checker'] = checker
+spec.loader.exec_module(checker)
+
+def make_files(directory, count, size):
+    """Create count files of the given size with random content."""
+    for i in range(count):
+        with open(os.path.join(directory, f"file_{i}.log"), 'wb') as f:
+            f.write(os.urandom(size))
+
+# File-size buckets for the read strategy benchmark: (label, size, count)
+SIZE_BUCKETS = [
+    ('4KiB', 4 * 1024, 2000),
+    ('256KiB', 256 * 1024, 400),
+    ('8MiB', 8 * 1024 * 1024, 16),
+    ('128MiB', 128 * 1024 * 1024, 2),
+]
+
+def bench_workers(files, max_workers, pool):
+    """Time hash_files from 1 to max_workers and check results match."""
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        result = checker.hash_files(files, checker.HashOptions(workers=workers, pool=pool))
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = (result, elapsed)
+        assert result == baseline[0], "Parallel result differs from sequential"
+        print(f"{pool:8} workers={workers:<3} {elapsed:8.3f}s  speedup x{baseline[1] / elapsed:.2f}")
+
+def bench_read_strategies(scale):
+    """Time each read strategy per file-size bucket, in MB/s."""
+    print(f"{'bucket':8} " + " ".join(f"{name:>10}" for name in checker.READ_STRATEGIES))
+    for label, size, count in SIZE_BUCKETS:
+        count = max(1, int(count * scale))
+        with tempfile.TemporaryDirectory() as directory:
+            make_files(directory, count, size)
+            files = checker.get_files(directory)
+            row, expected = [], None
+            for name in checker.READ_STRATEGIES:
+                start = time.perf_counter()
+                result = checker.hash_files(files, checker.HashOptions(read_strategy=name))
+                elapsed = time.perf_counter() - start
+                expected = expected or result
+                assert result == expected, f"{name} produced different hashes"
+                row.append(f"{size * count / elapsed / 1e6:10.1f}")
+            print(f"{label:8} " + " ".join(row))
+
+def bench_algorithms(size_mb):
+    """Hash one file (from the page cache) with each algorithm and report GB/s."""
+    with tempfile.TemporaryDirectory() as directory:
+        make_files(directory, 1, size_mb * 1024 * 1024)
+        file = checker.get_files(directory)[0]
+        checker.compute_hash(file)  # warm the page cache
+        for name in sorted(checker.HASH_ALGORITHMS):
+            start = time.perf_counter()
+            checker.compute_hash(file, algorithm=name)
+            elapsed = time.perf_counter() - start
+            print(f"{name:10} {size_mb * 1024 * 1024 / elapsed / 1e9:8.2f} GB/s")
+        missing = [name for name, module in (('blake3', checker.blake3), ('xxhash', checker.xxhash)) if module is None]
+        if missing:
+            print(f"(not installed: {', '.join(missing)})")
+
+def main():
+    parser = argparse.ArgumentParser(description='File Integrity Checker benchmark')
+    parser.add_argument('mode', nargs='?', choices=['workers', 'read', 'algorithms'], default='workers',
+                        help='workers: scaling from 1 to N workers; read: read strategies per file size; '
+                             'algorithms: throughput of each hash algorithm')
+    parser.add_argument('--files', type=int, default=200, help='Number of files to generate')
+    parser.add_argument('--size', type=int, default=1024 * 1024, help='Size of each file in bytes')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--size-mb', type=int, default=512, help='File size for the algorithms benchmark')
+    parser.add_argument('--scale', type=float, default=1.0, help='Scale the file counts of the read buckets')
+    args = parser.parse_args()
+
+    if args.mode == 'read':
+        bench_read_strategies(args.scale)
+        return
+    if args.mode == 'algorithms':
+        bench_algorithms(args.size_mb)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        make_files(directory, args.files, args.size)
+        files = checker.get_files(directory)
+        for pool in ('thread', 'process'):
+            bench_workers(files, args.max_workers, pool)
+
+if __name__ == "__main__":
+    main()
@@ -1,115 +1,1120 @@
 import os
 import sys
 import hashlib
+import io
+import csv
 import json
+import mmap
+import re
+import stat
+import fnmatch
+import sqlite3
 import argparse
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from typing import List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from inotify_watch import Inotify, IN_CREATE, IN_IGNORED, IN_ISDIR, IN_MOVED_TO, IN_Q_OVERFLOW
+
+# Optional fast hash implementations
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 # Path to store hashes
 HASH_STORE_FILE = 'file_hashes.json'
+SQLITE_STORE_FILE = 'file_hashes.db'
+# Number of writes grouped in one SQLite transaction
+SQLITE_BATCH_SIZE = 10000
 
-def compute_hash(file_path):
-    """Compute SHA-256 hash of a file."""
-    sha256 = hashlib.sha256()
+# Read strategy tuning (see benchmark.py read)
+CHUNK_SIZE = 8192
+READINTO_CHUNK_SIZE = 1024 * 1024
+SMALL_FILE_THRESHOLD = 64 * 1024
+_buffers = threading.local()
+
+# Output buffer for check reports
+REPORT_BUFFER_SIZE = 1024 * 1024
+
+# Files taken from the walk per scheduling window; within a window the
+# largest files are hashed first
+HASH_WINDOW = 1024
+
+# watch: seconds a file must stay quiet before it is re-hashed, and the
+# longest a continuously written file waits before being re-hashed anyway
+WATCH_DEBOUNCE = 0.5
+WATCH_MAX_DELAY = 5.0
+
+class _Crc32:
+    """hashlib-style wrapper around zlib.crc32 (non-cryptographic)."""
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+def _available_algorithms():
+    algorithms = {name: partial(hashlib.new, name) for name in ('sha256', 'sha512', 'sha3_256', 'blake2b', 'blake2s')}
+    if blake3 is not None:
+        algorithms['blake3'] = blake3.blake3
+    if xxhash is not None:
+        algorithms['xxh3_128'] = xxhash.xxh3_128
+        algorithms['xxh64'] = xxhash.xxh64
+    algorithms['crc32'] = _Crc32
+    return algorithms
+
+HASH_ALGORITHMS = _available_algorithms()
+DEFAULT_ALGORITHM = 'sha256'
+# Non-cryptographic first tier for --two-tier, fastest available first
+FAST_ALGORITHM = next(name for name in ('xxh3_128', 'blake3', 'crc32') if name in HASH_ALGORITHMS)
+
+@dataclass
+class HashOptions:
+    """How files are read and hashed.
+
+    With two_tier, stored entries also carry a fast_algorithm hash;
+    checks compare that first and only compute algorithm on mismatch.
+    """
+    workers: int = 1
+    pool: str = 'thread'
+    read_strategy: str = 'adaptive'
+    algorithm: str = DEFAULT_ALGORITHM
+    fast_algorithm: str = FAST_ALGORITHM
+    two_tier: bool = False
+
+@dataclass
+class WalkOptions:
+    """Which files are walked.
+
+    Patterns are globs matched against the file name or the full path,
+    or regular expressions (searched in the full path) when prefixed
+    with 're:'. Excluded directories are not descended into.
+    """
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+    max_depth: Optional[int] = None
+
+    def __post_init__(self):
+        self._include = [self._compile(pattern) for pattern in self.include]
+        self._exclude = [self._compile(pattern) for pattern in self.exclude]
+
+    @staticmethod
+    def _compile(pattern):
+        if pattern.startswith('re:'):
+            return re.compile(pattern[3:]).search
+        return lambda path: fnmatch.fnmatch(os.path.basename(path), pattern) or fnmatch.fnmatch(path, pattern)
+
+    def excluded(self, path):
+        return any(match(path) for match in self._exclude)
+
+    def included(self, path):
+        if self._include and not any(match(path) for match in self._include):
+            return False
+        return not self.excluded(path)
+
+def _read_chunked(f, size, update):
+    """Original strategy: 8 KiB f.read() calls."""
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        update(chunk)
+
+def _read_buffer(chunk_size):
+    """Return a preallocated buffer of chunk_size, reused per thread."""
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < chunk_size:
+        buffer = _buffers.buffer = bytearray(chunk_size)
+    return memoryview(buffer)[:chunk_size]
+
+def _read_readinto(f, size, update, chunk_size=READINTO_CHUNK_SIZE):
+    """Read into a reusable buffer, avoiding one bytes object per chunk."""
+    view = _read_buffer(chunk_size)
+    while True:
+        n = f.readinto(view)
+        if not n:
+            break
+        update(view[:n])
+
+def _read_mmap(f, size, update):
+    """Hash the whole file through a memory map.
+
+    Only for files nothing else writes to: if the file is truncated while
+    mapped (log rotation with copytruncate, for instance), touching the
+    missing pages raises SIGBUS and kills the process.
+    """
+    if size == 0:
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        update(mm)
+
+def _read_adaptive(f, size, update):
+    """Pick a strategy from the file size.
+
+    Never mmap: the files checked are typically logs that can be
+    truncated while being hashed, which a read survives (it just returns
+    less data) but a memory map turns into SIGBUS.
+    """
+    if size <= SMALL_FILE_THRESHOLD:
+        update(f.read())
+    else:
+        # Roughly 16 reads per file, between 64 KiB and 1 MiB each
+        chunk_size = min(max(size // 16, 64 * 1024), READINTO_CHUNK_SIZE)
+        _read_readinto(f, size, update, chunk_size)
+
+READ_STRATEGIES = {
+    'chunked': _read_chunked,
+    'readinto': _read_readinto,
+    'mmap': _read_mmap,
+    'adaptive': _read_adaptive,
+}
+
+def compute_hashes(file_path, algorithms, read_strategy='adaptive'):
+    """Compute several hashes of a file in one read pass, as a tuple."""
+    hashers = [HASH_ALGORITHMS[algorithm]() for algorithm in algorithms]
+    if len(hashers) == 1:
+        update = hashers[0].update
+    else:
+        def update(data):
+            for hasher in hashers:
+                hasher.update(data)
     try:
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        with open(file_path, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            READ_STRATEGIES[read_strategy](f, size, update)
+        return tuple(hasher.hexdigest() for hasher in hashers)
     except Exception as e:
-        print(f"Error reading {file_path}: {e}")
+        print(f"Error reading {file_path}: {e}", file=sys.stderr)
         return None
 
-def load_hashes():
+def compute_hash(file_path, read_strategy='adaptive', algorithm=DEFAULT_ALGORITHM):
+    """Compute the hash of a file (SHA-256 by default)."""
+    hashes = compute_hashes(file_path, (algorithm,), read_strategy)
+    return hashes[0] if hashes else None
+
+def _stat_fields(st):
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'inode': st.st_ino, 'device': st.st_dev}
+
+def file_stat(file_path):
+    """Return the stat fields used to detect unchanged files."""
+    try:
+        return _stat_fields(os.stat(file_path))
+    except OSError:
+        return None
+
+def _batched(items, size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+def iter_hashes(items, options=None, known=None, hasher=None):
+    """Hash (file, stat) items and yield (file, stat, hash) in input order.
+
+    Hashing starts as soon as items arrive, so it overlaps with the walk
+    producing them. With options.workers > 1, files are hashed in a
+    thread pool (I/O-bound disks) or a process pool (CPU-bound hashing).
+    Items are scheduled in windows of HASH_WINDOW files, largest first,
+    and the next window is submitted before the current one is drained
+    so workers stay busy. known(file, stat) may return a hash to reuse
+    instead of hashing the file. hasher(file) overrides how files are
+    hashed (it must be picklable for the process pool).
+    """
+    options = options or HashOptions()
+    hasher = hasher or partial(compute_hash, read_strategy=options.read_strategy, algorithm=options.algorithm)
+
+    def reuse(file, file_stat):
+        return known(file, file_stat) if known else None
+
+    if options.workers <= 1:
+        for file, file_stat in items:
+            file_hash = reuse(file, file_stat)
+            yield file, file_stat, hasher(file) if file_hash is None else file_hash
+        return
+
+    def submit(window):
+        results = [None] * len(window)
+        by_size = sorted(range(len(window)), key=lambda i: (window[i][1] or {}).get('size', 0), reverse=True)
+        for i in by_size:
+            file, file_stat = window[i]
+            file_hash = reuse(file, file_stat)
+            results[i] = executor.submit(hasher, file) if file_hash is None else file_hash
+        return window, results
+
+    def drain(window, results):
+        for (file, file_stat), result in zip(window, results):
+            yield file, file_stat, result.result() if isinstance(result, Future) else result
+
+    executor_cls = ProcessPoolExecutor if options.pool == 'process' else ThreadPoolExecutor
+    with executor_cls(max_workers=options.workers) as executor:
+        windows = deque()
+        for window in _batched(items, HASH_WINDOW):
+            windows.append(submit(window))
+            if len(windows) > 1:
+                yield from drain(*windows.popleft())
+        while windows:
+            yield from drain(*windows.popleft())
+
+def hash_files(files, options=None):
+    """Hash files, in parallel when options.workers > 1.
+
+    Returns a dict of file -> hash in the same order as the input.
+    """
+    items = ((file, file_stat(file)) for file in files)
+    return {file: file_hash for file, _, file_hash in iter_hashes(items, options)}
+
+def entry_hasher(options):
+    """Return the hasher used for new store entries.
+
+    It returns (hash,) or, in two-tier mode, (hash, fast_hash) computed
+    in a single read pass.
+    """
+    algorithms = (options.algorithm, options.fast_algorithm) if options.two_tier else (options.algorithm,)
+    return partial(compute_hashes, algorithms=algorithms, read_strategy=options.read_strategy)
+
+def make_entry(hashes, file_stat, options=None):
+    """Build a hash store entry from entry_hasher() output and the stat taken before hashing."""
+    options = options or HashOptions()
+    entry = {'hash': hashes[0], 'algorithm': options.algorithm}
+    if len(hashes) > 1:
+        entry.update(fast_hash=hashes[1], fast_algorithm=options.fast_algorithm)
+    entry.update(file_stat or {})
+    return entry
+
+def entry_hash(entry):
+    """Return the hash of a stored entry (old stores hold plain hash strings)."""
+    if isinstance(entry, dict):
+        return entry.get('hash')
+    return entry
+
+def entry_algorithm(entry):
+    """Return the algorithm of a stored entry (SHA-256 for old entries)."""
+    if isinstance(entry, dict):
+        return entry.get('algorithm') or DEFAULT_ALGORITHM
+    return DEFAULT_ALGORITHM
+
+def stored_algorithm(store):
+    """Return the algorithm of the first stored entry, used as the check default."""
+    for _, entry in store.items():
+        return entry_algorithm(entry)
+    return DEFAULT_ALGORITHM
+
+def rehash_for_entry(file, current_hash, entry, options):
+    """Recompute current_hash with the entry's algorithm if it differs from options.algorithm."""
+    algorithm = entry_algorithm(entry)
+    if entry is None or current_hash is None or algorithm == options.algorithm:
+        return current_hash
+    return compute_hash(file, options.read_strategy, algorithm)
+
+def stat_unchanged(file_stat, entry):
+    """Check whether a file's stat matches the one recorded in its entry."""
+    if file_stat is None or not isinstance(entry, dict):
+        return False
+    return all(entry.get(key) == value for key, value in file_stat.items())
+
+def reuse_unchanged(store, key='hash'):
+    """Return a known() callback for iter_hashes reusing hashes of stat-unchanged files."""
+    def known(file, file_stat):
+        entry = store.get(file)
+        return entry.get(key) if stat_unchanged(file_stat, entry) else None
+    return known
+
+def _is_under(file, target_path):
+    return file == target_path or file.startswith(os.path.join(target_path, ''))
+
+def _prefix_range(prefix):
+    """Return the (low, high) bounds of paths strictly below a directory."""
+    low = os.path.join(prefix, '')
+    return low, low[:-1] + chr(ord(os.sep) + 1)
+
+def load_hashes(store_file=HASH_STORE_FILE):
     """Load stored hashes from file."""
-    if os.path.exists(HASH_STORE_FILE):
-        with open(HASH_STORE_FILE, 'r') as f:
+    if os.path.exists(store_file):
+        with open(store_file, 'r') as f:
             return json.load(f)
     return {}
 
-def save_hashes(hashes):
+def save_hashes(hashes, store_file=HASH_STORE_FILE):
     """Save hashes to file."""
-    with open(HASH_STORE_FILE, 'w') as f:
+    with open(store_file, 'w') as f:
         json.dump(hashes, f, indent=4)
 
-def get_files(target_path):
+class JsonHashStore:
+    """Hash store kept in memory and written back as one JSON file."""
+
+    def __init__(self, store_file=HASH_STORE_FILE):
+        self.store_file = store_file
+        self.dirs_file = os.path.splitext(store_file)[0] + '.dirs.json'
+        self.hashes = load_hashes(store_file)
+        self.dirs = load_hashes(self.dirs_file)
+        self.dirty = False
+        self.dirs_dirty = False
+
+    def get(self, file):
+        return self.hashes.get(file)
+
+    def put(self, file, entry):
+        self.hashes[file] = entry
+        self.dirty = True
+
+    def delete(self, file):
+        if self.hashes.pop(file, None) is not None:
+            self.dirty = True
+
+    def items(self, prefix=None):
+        """Yield (path, entry); under a prefix in path order, like the SQLite store."""
+        if prefix is None:
+            return iter(self.hashes.items())
+        return iter(sorted((file, entry) for file, entry in self.hashes.items() if _is_under(file, prefix)))
+
+    def get_dir(self, directory):
+        node = self.dirs.get(directory)
+        return tuple(node) if node else None
+
+    def children(self, directories):
+        """Map each directory to {name: (kind, hash)} of its direct files and subdirectories."""
+        listing = {directory: {} for directory in directories}
+        for kind, nodes in (('f', ((file, entry_hash(entry)) for file, entry in self.hashes.items())),
+                            ('d', ((directory, node[0]) for directory, node in self.dirs.items()))):
+            for path, digest in nodes:
+                parent, name = os.path.split(path)
+                if name and digest is not None and parent in listing:
+                    listing[parent][name] = (kind, digest)
+        return listing
+
+    def put_dir(self, directory, node):
+        self.dirs[directory] = list(node)
+        self.dirs_dirty = True
+
+    def delete_dir(self, directory):
+        if self.dirs.pop(directory, None) is not None:
+            self.dirs_dirty = True
+
+    def put_dirs(self, root, nodes):
+        """Replace the directory digests of root and everything below it with (directory, node) pairs."""
+        self.dirs = {directory: node for directory, node in self.dirs.items() if not _is_under(directory, root)}
+        self.dirs.update((directory, list(node)) for directory, node in nodes)
+        self.dirs_dirty = True
+
+    def clear(self):
+        self.hashes = {}
+        self.dirs = {}
+        self.dirty = self.dirs_dirty = True
+
+    def close(self):
+        if self.dirty:
+            save_hashes(self.hashes, self.store_file)
+        if self.dirs_dirty:
+            save_hashes(self.dirs, self.dirs_file)
+
+class SqliteHashStore:
+    """Hash store in a SQLite database, one row per file.
+
+    Rows are read on demand and writes are batched into transactions,
+    so memory use does not grow with the number of tracked files and
+    updating one file does not rewrite the whole store.
+    """
+
+    COLUMNS = ('hash', 'size', 'mtime_ns', 'inode', 'device', 'algorithm', 'fast_hash', 'fast_algorithm')
+    # Columns added after the first schema, with their types
+    ADDED_COLUMNS = {'algorithm': 'TEXT', 'fast_hash': 'TEXT', 'fast_algorithm': 'TEXT'}
+
+    def __init__(self, store_file=SQLITE_STORE_FILE):
+        self.conn = sqlite3.connect(store_file)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS hashes ('
+            'path TEXT PRIMARY KEY, hash TEXT NOT NULL, '
+            'size INTEGER, mtime_ns INTEGER, inode INTEGER, device INTEGER)'
+        )
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(hashes)')}
+        for column, column_type in self.ADDED_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f'ALTER TABLE hashes ADD COLUMN {column} {column_type}')
+        self.select = 'SELECT path, ' + ', '.join(self.COLUMNS) + ' FROM hashes'
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS dir_digests (path TEXT PRIMARY KEY, digest TEXT NOT NULL, entries INTEGER)'
+        )
+        self.pending = 0
+
+    def _entry(self, row):
+        return {key: value for key, value in zip(self.COLUMNS, row) if value is not None}
+
+    def get(self, file):
+        row = self.conn.execute(self.select + ' WHERE path = ?', (file,)).fetchone()
+        return self._entry(row[1:]) if row else None
+
+    def put(self, file, entry):
+        if not isinstance(entry, dict):
+            entry = {'hash': entry}
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO hashes (path, {', '.join(self.COLUMNS)}) "
+            f"VALUES (?{', ?' * len(self.COLUMNS)})",
+            (file,) + tuple(entry.get(key) for key in self.COLUMNS)
+        )
+        self._written()
+
+    def delete(self, file):
+        self.conn.execute('DELETE FROM hashes WHERE path = ?', (file,))
+        self._written()
+
+    def _written(self):
+        self.pending += 1
+        if self.pending >= SQLITE_BATCH_SIZE:
+            self.conn.commit()
+            self.pending = 0
+
+    def items(self, prefix=None):
+        if prefix is None:
+            cursor = self.conn.execute(self.select + ' ORDER BY path')
+        else:
+            cursor = self.conn.execute(self.select + ' WHERE path = ? OR (path >= ? AND path < ?) ORDER BY path',
+                                       (prefix,) + _prefix_range(prefix))
+        for row in cursor:
+            yield row[0], self._entry(row[1:])
+
+    def get_dir(self, directory):
+        return self.conn.execute('SELECT digest, entries FROM dir_digests WHERE path = ?', (directory,)).fetchone()
+
+    def _direct_children(self, table, column, directory):
+        """Yield (name, value) for the rows directly below a directory.
+
+        Each step is one index seek: after a nested row the seek jumps
+        past that whole subdirectory, so the cost follows the number of
+        children rather than the size of the subtree.
+        """
+        low, high = _prefix_range(directory)
+        bound, op = low, '>'
+        while True:
+            row = self.conn.execute(f'SELECT path, {column} FROM {table} WHERE path {op} ? AND path < ? '
+                                    'ORDER BY path LIMIT 1', (bound, high)).fetchone()
+            if row is None:
+                return
+            name, nested, _ = row[0][len(low):].partition(os.sep)
+            if nested:
+                bound, op = low + name + chr(ord(os.sep) + 1), '>='
+            else:
+                bound, op = row[0], '>'
+                yield name, row[1]
+
+    def children(self, directories):
+        """Map each directory to {name: (kind, hash)} of its direct files and subdirectories."""
+        listing = {}
+        for directory in directories:
+            entries = listing[directory] = {}
+            entries.update((name, ('f', digest)) for name, digest in self._direct_children('hashes', 'hash', directory))
+            entries.update((name, ('d', digest))
+                           for name, digest in self._direct_children('dir_digests', 'digest', directory))
+        return listing
+
+    def put_dir(self, directory, node):
+        self.conn.execute('INSERT OR REPLACE INTO dir_digests (path, digest, entries) VALUES (?, ?, ?)',
+                          (directory,) + tuple(node))
+        self._written()
+
+    def delete_dir(self, directory):
+        self.conn.execute('DELETE FROM dir_digests WHERE path = ?', (directory,))
+        self._written()
+
+    def put_dirs(self, root, nodes):
+        """Replace the directory digests of root and everything below it with (directory, node) pairs."""
+        self.conn.execute('DELETE FROM dir_digests WHERE path = ? OR (path >= ? AND path < ?)',
+                          (root,) + _prefix_range(root))
+        for directory, node in nodes:
+            self.put_dir(directory, node)
+        self.conn.commit()
+        self.pending = 0
+
+    def clear(self):
+        self.conn.execute('DELETE FROM hashes')
+        self.conn.execute('DELETE FROM dir_digests')
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+STORE_BACKENDS = {
+    'json': (JsonHashStore, HASH_STORE_FILE),
+    'sqlite': (SqliteHashStore, SQLITE_STORE_FILE),
+}
+
+def open_store(backend='json', store_file=None):
+    """Open the hash store for the given backend."""
+    store_cls, default_file = STORE_BACKENDS[backend]
+    return store_cls(store_file or default_file)
+
+def migrate_store(json_file, store):
+    """Copy every entry and directory digest of a JSON hash store into another store."""
+    source = JsonHashStore(json_file)
+    count = 0
+    for file, entry in source.items():
+        store.put(file, entry)
+        count += 1
+    for directory, node in source.dirs.items():
+        store.put_dir(directory, node)
+    print(f"Migrated {count} entries and {len(source.dirs)} directory digests from {json_file}.")
+
+def iter_files(target_path, walk=None):
+    """Yield (path, stat) for the files under a directory, or for a single file.
+
+    Streams os.scandir entries and reuses their stat results, so memory
+    stays flat on deep trees and hashing can start while the walk runs.
+    Special files (sockets, FIFOs, devices) are skipped and symlinked
+    directories are not followed.
+    """
+    walk = walk or WalkOptions()
+    try:
+        st = os.stat(target_path)
+    except OSError:
+        print(f"Path not found: {target_path}", file=sys.stderr)
+        return
+    if stat.S_ISREG(st.st_mode):
+        yield target_path, _stat_fields(st)
+        return
+    if not stat.S_ISDIR(st.st_mode):
+        print(f"Not a regular file or directory: {target_path}", file=sys.stderr)
+        return
+
+    stack = [(target_path, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if (walk.max_depth is None or depth < walk.max_depth) and not walk.excluded(entry.path):
+                                subdirs.append(entry.path)
+                        elif entry.is_file() and walk.included(entry.path):
+                            yield entry.path, _stat_fields(entry.stat())
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error reading {directory}: {e}", file=sys.stderr)
+            continue
+        stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+
+def get_files(target_path, walk=None):
     """Get list of log files from directory or single file."""
-    files = []
-    if os.path.isfile(target_path):
-        files.append(target_path)
-    elif os.path.isdir(target_path):
-        for root, dirs, filenames in os.walk(target_path):
-            for filename in filenames:
-                # Consider only log files if needed, or all files
-                files.append(os.path.join(root, filename))
+    return [file for file, _ in iter_files(target_path, walk)]
+
+def _tree_root(target_path):
+    return target_path.rstrip(os.sep) or os.sep
+
+def iter_tree_digests(file_hashes, root):
+    """Compute Merkle digests for root and every directory below it, bottom-up.
+
+    file_hashes yields (path, hash) for files under root, with the files
+    of each subtree next to each other (a depth-first walk, or paths in
+    sorted order). A directory digest covers the sorted names, kinds and
+    digests of its entries, so two trees are identical exactly when their
+    root digests match. Yields (directory, (digest, number of entries),
+    entries) once all of a directory's entries are known, entries being
+    {name: (kind, hash)} where kind is 'f' for files and 'd' for
+    directories. Only the directories on the current path are held, so
+    memory does not grow with the size of the tree.
+    """
+    stack = [(root, {})]
+    for path, file_hash in file_hashes:
+        if path == root or file_hash is None or not _is_under(path, root):
+            continue
+        parent = os.path.dirname(path)
+        while not _is_under(parent, stack[-1][0]):
+            yield _close_directory(stack)
+        opened = []
+        while parent != stack[-1][0]:
+            opened.append(parent)
+            parent = os.path.dirname(parent)
+        stack.extend((directory, {}) for directory in reversed(opened))
+        stack[-1][1][os.path.basename(path)] = ('f', file_hash)
+    while stack:
+        yield _close_directory(stack)
+
+def _close_directory(stack):
+    directory, entries = stack.pop()
+    node = _dir_digest(entries)
+    if stack:
+        stack[-1][1][os.path.basename(directory)] = ('d', node[0])
+    return directory, node, entries
+
+def _dir_digest(entries):
+    """Return (digest, number of entries) of a directory from {name: (kind, hash)}."""
+    sha256 = hashlib.sha256()
+    for name, (kind, digest) in sorted(entries.items()):
+        sha256.update(f"{kind}\0{name}\0{digest}\n".encode('utf-8', 'surrogateescape'))
+    return sha256.hexdigest(), len(entries)
+
+def refresh_tree_digests(target_path, store, changed=()):
+    """Recompute the stored directory digests affected by changed files under target_path.
+
+    Only the directories holding a changed (updated or deleted) file and
+    their ancestors are recomputed, each from the stored digests of its
+    direct children. Directories left without tracked files lose their
+    digest. If target_path has no digest yet, its whole subtree is built
+    from the store.
+    """
+    root = _tree_root(target_path)
+    if not os.path.isdir(root):
+        root = os.path.dirname(root)
+    if not root:
+        return
+    dirty = set()
+    if store.get_dir(root) is None:
+        leaves = ((file, entry_hash(entry)) for file, entry in store.items(root))
+        store.put_dirs(root, ((directory, node) for directory, node, _ in iter_tree_digests(leaves, root)))
     else:
-        print(f"Path not found: {target_path}")
-    return files
+        for file in changed:
+            directory = os.path.dirname(file)
+            while _is_under(directory, root) and directory not in dirty:
+                dirty.add(directory)
+                if directory == root:
+                    break
+                directory = os.path.dirname(directory)
+        if not dirty:
+            return
+    # Keep the ancestors up to the highest one with a digest current
+    ancestors = []
+    directory = root
+    while True:
+        parent = os.path.dirname(directory)
+        if not parent or parent == directory:
+            break
+        ancestors.append(parent)
+        if store.get_dir(parent) is not None:
+            dirty.update(ancestors)
+        directory = parent
+
+    listing = store.children(dirty)
+    # A child path is always longer than its parent, so children come first
+    for directory in sorted(dirty, key=len, reverse=True):
+        entries = listing[directory]
+        parent, name = os.path.split(directory)
+        if entries:
+            node = _dir_digest(entries)
+            store.put_dir(directory, node)
+            if parent in listing:
+                listing[parent][name] = ('d', node[0])
+        else:
+            store.delete_dir(directory)
+            if parent in listing:
+                listing[parent].pop(name, None)
 
-def init_hashes(target_path):
+def print_digests(target_path, store):
+    """Print the stored digest of a directory and of its direct subdirectories.
+
+    Subdirectories are printed in name order, so two hosts can compare
+    trees by diffing these lines and repeating the command only on the
+    subdirectories whose digests differ.
+    """
+    root = _tree_root(target_path)
+    node = store.get_dir(root)
+    if node is None:
+        print(f"{root}: No stored tree digest (consider running init or update).", file=sys.stderr)
+        return
+    print(f"{node[0]}  {root}")
+    for name, (kind, digest) in sorted(store.children([root])[root].items()):
+        if kind == 'd':
+            print(f"{digest}  {os.path.join(root, name)}")
+
+def init_hashes(target_path, store, options=None, walk=None):
     """Initialize and store hashes for files."""
-    files = get_files(target_path)
-    hashes = {}
-    for file in files:
-        h = compute_hash(file)
+    options = options or HashOptions()
+    store.clear()
+    for file, file_stat, h in iter_hashes(iter_files(target_path, walk), options, hasher=entry_hasher(options)):
         if h:
-            hashes[file] = h
+            store.put(file, make_entry(h, file_stat, options))
             print(f"Hashed {file}")
-    save_hashes(hashes)
+    refresh_tree_digests(target_path, store)
     print("Hashes stored successfully.")
 
-def check_files(target_path):
-    """Check files against stored hashes."""
-    stored_hashes = load_hashes()
-    files = get_files(target_path)
-    modified_files = []
-    unmodified_files = []
+class Reporter:
+    """Streams check results as they are produced.
 
-    for file in files:
-        current_hash = compute_hash(file)
-        stored_hash = stored_hashes.get(file)
+    Only counters are kept in memory (plus the list of changed files in
+    the default text format, for its closing summary). Output goes through
+    a large buffered writer instead of one print() per file.
+
+    Formats: text (the original messages), jsonl, csv, and summary (only
+    the final counts). With only_changed, unmodified files are not written.
+    """
+
+    FORMATS = ('text', 'jsonl', 'csv', 'summary')
+    TEXT = {
+        'unmodified': "{file}: Status: Unmodified",
+        'modified': "{file}: Status: Modified (Hash mismatch)",
+        'new': "{file}: No stored hash (consider running init).",
+        'deleted': "{file}: Status: Deleted",
+        'deleted-directory': "{file}: Status: Deleted (directory)",
+    }
+
+    def __init__(self, fmt='text', only_changed=False, output=None):
+        self.fmt = fmt
+        self.only_changed = only_changed
+        self.counts = dict.fromkeys(self.TEXT, 0)
+        self.changed_files = []
+        sys.stdout.flush()
+        if output:
+            self.stream = open(output, 'w', buffering=REPORT_BUFFER_SIZE, newline='')
+        else:
+            self.stream = io.open(sys.stdout.fileno(), 'w', buffering=REPORT_BUFFER_SIZE,
+                                  closefd=False, newline='')
+        self.csv = csv.writer(self.stream) if fmt == 'csv' else None
+        if self.csv:
+            self.csv.writerow(['path', 'status', 'hash', 'stored_hash'])
+
+    def result(self, file, status, current_hash=None, stored_hash=None):
+        self.counts[status] += 1
+        if self.fmt == 'text' and status not in ('unmodified', 'new'):
+            self.changed_files.append((file, status))
+        if self.fmt == 'summary' or (self.only_changed and status == 'unmodified'):
+            return
+        if self.fmt == 'jsonl':
+            self.stream.write(json.dumps({'path': file, 'status': status, 'hash': current_hash,
+                                          'stored_hash': stored_hash}) + '\n')
+        elif self.csv:
+            self.csv.writerow([file, status, current_hash or '', stored_hash or ''])
+        else:
+            self.stream.write(self.TEXT[status].format(file=file) + '\n')
+
+    def changed(self):
+        return sum(count for status, count in self.counts.items() if status != 'unmodified')
+
+    def close(self):
+        if self.fmt == 'text' and self.changed_files:
+            self.stream.write("\nChanged files:\n")
+            for f, status in self.changed_files:
+                self.stream.write(f" - {f} ({status})\n")
+        elif self.fmt == 'summary':
+            total = sum(self.counts.values())
+            details = ', '.join(f"{count} {status}" for status, count in self.counts.items() if count)
+            self.stream.write(f"Checked {total} files: {details or 'nothing to report'}\n")
+        # Closing the stdout wrapper flushes it but leaves the descriptor open
+        self.stream.close()
+
+def _confirm_fast_hash(file, fast_hash, entry, options):
+    """Return the stored hash if the fast hash matches, else the confirmed full hash."""
+    if (isinstance(entry, dict) and fast_hash is not None and entry.get('fast_hash') == fast_hash
+            and entry.get('fast_algorithm') == options.fast_algorithm):
+        return entry_hash(entry)
+    return compute_hash(file, options.read_strategy, entry_algorithm(entry))
+
+def check_files(target_path, store, options=None, incremental=False, paranoid=False, walk=None,
+                reporter=None):
+    """Check files against stored hashes.
+
+    In incremental mode, files whose size, mtime, inode and device match
+    the stored entry are reported unmodified without being re-hashed.
+    paranoid forces a full re-hash regardless. In two-tier mode only the
+    fast hash is computed, and the stored algorithm confirms mismatches.
+    """
+    options = options or HashOptions()
+    reporter = reporter or Reporter()
+
+    skip_unchanged = incremental and not paranoid
+    if options.two_tier:
+        known = reuse_unchanged(store, 'fast_hash') if skip_unchanged else None
+        hasher = partial(compute_hash, read_strategy=options.read_strategy, algorithm=options.fast_algorithm)
+    else:
+        known = reuse_unchanged(store) if skip_unchanged else None
+        hasher = None
+    for file, _, current_hash in iter_hashes(iter_files(target_path, walk), options, known, hasher):
+        entry = store.get(file)
+        stored_hash = entry_hash(entry)
         if stored_hash is None:
-            print(f"{file}: No stored hash (consider running init).")
+            reporter.result(file, 'new', current_hash)
             continue
-        if current_hash != stored_hash:
-            print(f"{file}: Status: Modified (Hash mismatch)")
-            modified_files.append(file)
+        if options.two_tier:
+            current_hash = _confirm_fast_hash(file, current_hash, entry, options)
         else:
-            print(f"{file}: Status: Unmodified")
-            unmodified_files.append(file)
-
-    if modified_files:
-        print("\nModified files:")
-        for f in modified_files:
-            print(f" - {f}")
-
-def update_hash(target_path):
-    """Update stored hashes for files."""
-    files = get_files(target_path)
-    stored_hashes = load_hashes()
-    for file in files:
-        new_hash = compute_hash(file)
+            current_hash = rehash_for_entry(file, current_hash, entry, options)
+        reporter.result(file, 'modified' if current_hash != stored_hash else 'unmodified', current_hash, stored_hash)
+    reporter.close()
+
+def check_tree(target_path, store, options=None, paranoid=False, walk=None, reporter=None):
+    """Check a directory by comparing Merkle digests with the stored ones.
+
+    Only files whose stat changed are re-hashed (all files with paranoid),
+    and entries are only compared in directories whose digest differs.
+    """
+    root = _tree_root(target_path)
+    if not os.path.isdir(root):
+        print(f"Not a directory: {target_path}", file=sys.stderr)
+        return
+    if store.get_dir(root) is None:
+        print(f"{root}: No stored tree digest (consider running init or update).", file=sys.stderr)
+        return
+
+    options = options or HashOptions()
+    known = None if paranoid else reuse_unchanged(store)
+    leaves = ((file, rehash_for_entry(file, h, store.get(file), options))
+              for file, _, h in iter_hashes(iter_files(root, walk), options, known))
+    reporter = reporter or Reporter()
+    unmodified = False
+    # Bottom-up: each directory whose digest differs reports its own entries
+    for directory, (digest, _), current in iter_tree_digests(leaves, root):
+        stored = store.get_dir(directory)
+        if stored is not None and stored[0] == digest:
+            unmodified = directory == root
+            continue
+        for name, (kind, file_digest) in sorted(current.items()):
+            if kind == 'd':
+                continue
+            path = os.path.join(directory, name)
+            stored_hash = entry_hash(store.get(path))
+            if stored_hash is None:
+                reporter.result(path, 'new', file_digest)
+            elif file_digest != stored_hash:
+                reporter.result(path, 'modified', file_digest, stored_hash)
+        _report_deleted(directory, current, store, reporter)
+
+    if unmodified and reporter.fmt == 'text':
+        reporter.stream.write(f"{root}: Status: Unmodified (tree digest matches)\n")
+    reporter.close()
+
+def _report_deleted(directory, current, store, reporter):
+    """Report the stored entries of directory that are gone from current ({name: (kind, hash)}).
+
+    A stored subdirectory with no files left in the walk may still exist
+    (all its tracked files deleted), so its stored files are checked one
+    by one before the directory itself is reported.
+    """
+    for name, (kind, digest) in sorted(store.children([directory])[directory].items()):
+        if name in current:
+            continue
+        path = os.path.join(directory, name)
+        if kind == 'f':
+            if not os.path.isfile(path):
+                reporter.result(path, 'deleted', None, digest)
+            continue
+        for file, entry in store.items(path):
+            if not os.path.isfile(file):
+                reporter.result(file, 'deleted', None, entry_hash(entry))
+        if not os.path.isdir(path):
+            reporter.result(path, 'deleted-directory', None, digest)
+
+def _entry_current(file_stat, entry, options):
+    """Check whether an entry is up to date: same stat and hashed the way options ask."""
+    return (stat_unchanged(file_stat, entry) and entry_algorithm(entry) == options.algorithm
+            and (not options.two_tier or entry.get('fast_algorithm') == options.fast_algorithm))
+
+def update_hash(target_path, store, options=None, incremental=False, paranoid=False, walk=None):
+    """Update stored hashes for files, and forget stored files that were deleted."""
+    options = options or HashOptions()
+    skip_unchanged = incremental and not paranoid
+    stale = ((file, file_stat) for file, file_stat in iter_files(target_path, walk)
+             if not (skip_unchanged and _entry_current(file_stat, store.get(file), options)))
+    changed = []
+    for file, file_stat, new_hash in iter_hashes(stale, options, hasher=entry_hasher(options)):
         if new_hash:
-            stored_hashes[file] = new_hash
+            entry = make_entry(new_hash, file_stat, options)
+            if entry_hash(store.get(file)) != entry_hash(entry):
+                changed.append(file)
+            store.put(file, entry)
             print(f"Hash for {file} updated.")
-    save_hashes(stored_hashes)
+    deleted = [file for file, _ in store.items(target_path) if not os.path.isfile(file)]
+    for file in deleted:
+        store.delete(file)
+        print(f"Hash for {file} removed (file deleted).")
+    refresh_tree_digests(target_path, store, changed + deleted)
     print("Hash update completed.")
 
+def _store_is_empty(store):
+    return next(iter(store.items()), None) is None
+
+def report_changes(files, store, options, last_reported):
+    """Re-hash changed files and print those whose status changed."""
+    current_hashes = hash_files([file for file in files if os.path.isfile(file)], options)
+    for file in files:
+        entry = store.get(file)
+        stored_hash = entry_hash(entry)
+        if file in current_hashes:
+            current_hash = rehash_for_entry(file, current_hashes[file], entry, options)
+            if current_hash is None:
+                continue
+            if stored_hash is None:
+                status = "New file (no stored hash)"
+            elif current_hash != stored_hash:
+                status = "Modified (Hash mismatch)"
+            else:
+                status = "Unmodified"
+        elif stored_hash is not None:
+            current_hash, status = None, "Deleted"
+        else:
+            continue
+        if last_reported.get(file, ("Unmodified", stored_hash)) == (status, current_hash):
+            continue
+        last_reported[file] = (status, current_hash)
+        print(f"{time.strftime('%H:%M:%S')} {file}: Status: {status}", flush=True)
+
+def rescan_changed(target_path, store, walk=None):
+    """List files whose stat no longer matches the store, plus deleted files."""
+    changed = [file for file, file_stat in iter_files(target_path, walk)
+               if not stat_unchanged(file_stat, store.get(file))]
+    changed.extend(file for file, _ in store.items(target_path) if not os.path.exists(file))
+    return changed
+
+def watch_files(target_path, store, options=None, debounce=WATCH_DEBOUNCE, max_delay=WATCH_MAX_DELAY,
+                walk=None):
+    """Watch files with inotify and report modifications as they happen.
+
+    The baseline is built once (if the store is empty). After that only
+    files that were written, renamed or deleted are re-hashed. Events for
+    a file are coalesced until it has been quiet for debounce seconds, or
+    max_delay seconds have passed since its first event. When the kernel
+    event queue overflows, files are re-stat'ed and only those whose stat
+    changed are re-hashed.
+    """
+    options = options or HashOptions()
+    walk = walk or WalkOptions()
+    if _store_is_empty(store):
+        init_hashes(target_path, store, options, walk)
+
+    single_file = target_path if os.path.isfile(target_path) else None
+    inotify = Inotify()
+    watches = {}
+
+    def add_tree(directory):
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if not walk.excluded(os.path.join(root, d))]
+            try:
+                watches[inotify.add_watch(root)] = root
+            except OSError as e:
+                print(f"Cannot watch {root}: {e}", file=sys.stderr)
+
+    if single_file:
+        directory = os.path.dirname(single_file)
+        watches[inotify.add_watch(directory or '.')] = directory
+    elif os.path.isdir(target_path):
+        add_tree(target_path)
+    else:
+        print(f"Path not found: {target_path}", file=sys.stderr)
+        return
+
+    print(f"Watching {target_path} for changes (Ctrl-C to stop)...", flush=True)
+    pending = {}
+    last_reported = {}
+    try:
+        while True:
+            events = inotify.read_events(debounce if pending else None)
+            now = time.monotonic()
+            for wd, mask, cookie, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    print("Event queue overflow, rescanning changed files.", flush=True)
+                    if not single_file:
+                        add_tree(target_path)
+                    report_changes(rescan_changed(target_path, store, walk), store, options, last_reported)
+                    continue
+                directory = watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del watches[wd]
+                    continue
+                path = os.path.join(directory, name)
+                if single_file and path != single_file:
+                    continue
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not walk.excluded(path):
+                        add_tree(path)
+                        for file, _ in iter_files(path, walk):
+                            pending.setdefault(file, (now, now))
+                    continue
+                if not single_file and not walk.included(path):
+                    continue
+                first_seen, _ = pending.get(path, (now, now))
+                pending[path] = (first_seen, now)
+
+            ready = [file for file, (first_seen, last_seen) in pending.items()
+                     if now - last_seen >= debounce or now - first_seen >= max_delay]
+            for file in ready:
+                del pending[file]
+            if ready:
+                report_changes(ready, store, options, last_reported)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        inotify.close()
+
 def main():
     parser = argparse.ArgumentParser(description='File Integrity Checker')
-    parser.add_argument('command', choices=['init', 'check', 'update', '-check'], help='Operation to perform')
-    parser.add_argument('path', help='File or directory path')
+    parser.add_argument('command', choices=['init', 'check', 'update', '-check', 'migrate', 'watch', 'digest'],
+                        help='Operation to perform')
+    parser.add_argument('path', help='File or directory path (for migrate: the JSON store to import)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of parallel hashing workers')
+    parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                        help='Use threads for I/O-bound disks, processes for CPU-bound hashing')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-hash files whose size, mtime, inode or device changed')
+    parser.add_argument('--paranoid', action='store_true', help='Force a full re-hash, even with --incremental')
+    parser.add_argument('--include', action='append', default=[], metavar='PATTERN',
+                        help="Only files matching this glob (or 're:' regex); repeatable")
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help="Skip files and directories matching this glob (or 're:' regex); repeatable")
+    parser.add_argument('--max-depth', type=int, help='Do not descend more than this many directories deep')
+    parser.add_argument('--tree', action='store_true',
+                        help='check: compare Merkle directory digests and only descend into changed subtrees')
+    parser.add_argument('--algorithm', choices=sorted(HASH_ALGORITHMS),
+                        help=f'Hash algorithm for new entries (default: {DEFAULT_ALGORITHM}; '
+                             'check defaults to the algorithm found in the store)')
+    parser.add_argument('--two-tier', action='store_true',
+                        help='Also store a fast non-cryptographic hash; check compares it first and '
+                             'only computes the full hash on mismatch')
+    parser.add_argument('--fast-algorithm', choices=sorted(HASH_ALGORITHMS), default=FAST_ALGORITHM,
+                        help='First-tier hash for --two-tier')
+    parser.add_argument('--format', choices=Reporter.FORMATS, default='text', help='check: report format')
+    parser.add_argument('--only-changed', action='store_true', help='check: do not report unmodified files')
+    parser.add_argument('--output', help='check: write the report to this file instead of stdout')
+    parser.add_argument('--store', choices=sorted(STORE_BACKENDS), default='json', help='Hash store backend')
+    parser.add_argument('--store-file', help='Hash store location (defaults depend on the backend)')
+    parser.add_argument('--read-strategy', choices=sorted(READ_STRATEGIES), default='adaptive',
+                        help='How files are read while hashing')
+    parser.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE,
+                        help='watch: seconds a file must stay quiet before it is re-hashed')
     args = parser.parse_args()
 
-    if args.command == 'init':
-        init_hashes(args.path)
-    elif args.command == 'check':
-        check_files(args.path)
-    elif args.command == 'update':
-        update_hash(args.path)
-    elif args.command == '-check':
-        check_files(args.path)
-    else:
-        print("Unknown command.")
+    walk = WalkOptions(include=args.include, exclude=args.exclude, max_depth=args.max_depth)
+    store = open_store(args.store, args.store_file)
+    try:
+        algorithm = args.algorithm
+        if algorithm is None:
+            algorithm = DEFAULT_ALGORITHM if args.command == 'init' else stored_algorithm(store)
+        options = HashOptions(workers=args.workers, pool=args.pool, read_strategy=args.read_strategy,
+                              algorithm=algorithm, fast_algorithm=args.fast_algorithm, two_tier=args.two_tier)
+        if args.command == 'init':
+            init_hashes(args.path, store, options, walk)
+        elif args.command in ('check', '-check') and args.tree:
+            check_tree(args.path, store, options, args.paranoid, walk,
+                       Reporter(args.format, args.only_changed, args.output))
+        elif args.command in ('check', '-check'):
+            check_files(args.path, store, options, args.incremental, args.paranoid, walk,
+                        Reporter(args.format, args.only_changed, args.output))
+        elif args.command == 'update':
+            update_hash(args.path, store, options, args.incremental, args.paranoid, walk)
+        elif args.command == 'watch':
+            watch_files(args.path, store, options, args.debounce, walk=walk)
+        elif args.command == 'migrate':
+            migrate_store(args.path, store)
+        elif args.command == 'digest':
+            print_digests(args.path, store)
+        else:
+            print("Unknown command.")
+    finally:
+        store.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Tests for integrity-checker.py (stdlib only)
+
+    python3 -m unittest test_integrity_checker
+"""
+import io
+import os
+import sys
+import json
+import shutil
+import tempfile
+import contextlib
+import importlib.util
+from unittest import TestCase
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+spec = importlib.util.spec_from_file_location('integrity_checker', os.path.join(HERE, 'integrity-checker.py'))
+checker = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(checker)
+
+
+class TestCheckTree(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split('/'))
+
+    def write(self, name, content):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), 'w') as f:
+            f.write(content)
+
+    def check(self, store, fmt='jsonl'):
+        output = os.path.join(self.directory, 'report')
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            checker.check_tree(self.root, store, reporter=checker.Reporter(fmt, output=output))
+        with open(output) as f:
+            return f.read()
+
+    def statuses(self, store):
+        records = [json.loads(line) for line in self.check(store).splitlines()]
+        return {os.path.relpath(record['path'], self.root): record['status'] for record in records}
+
+    def for_each_store(self, test):
+        """Run test(store) on a freshly initialized tree with each store backend"""
+        for backend in sorted(checker.STORE_BACKENDS):
+            with self.subTest(store=backend):
+                self.root = os.path.join(self.directory, backend, 't')
+                for name in ('a/f1.log', 'a/f2.log', 'b/f3.log', 'g.log'):
+                    self.write(name, name)
+                store_file = os.path.join(self.directory, backend, 'hashes.' + backend)
+                store = checker.open_store(backend, store_file)
+                try:
+                    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                        checker.init_hashes(self.root, store)
+                    test(store)
+                finally:
+                    store.close()
+
+    def test_unmodified(self):
+        def test(store):
+            self.assertEqual(self.statuses(store), {})
+            self.assertIn('Unmodified (tree digest matches)', self.check(store, 'text'))
+        self.for_each_store(test)
+
+    def test_modified_and_new(self):
+        def test(store):
+            self.write('a/f1.log', 'changed')
+            self.write('b/c/new.log', 'new')
+            self.assertEqual(self.statuses(store), {'a/f1.log': 'modified', 'b/c/new.log': 'new'})
+        self.for_each_store(test)
+
+    def test_directory_kept_all_tracked_files_deleted(self):
+        def test(store):
+            os.remove(self.path('a/f1.log'))
+            os.remove(self.path('a/f2.log'))
+            self.assertEqual(self.statuses(store), {'a/f1.log': 'deleted', 'a/f2.log': 'deleted'})
+            self.assertNotIn('Unmodified', self.check(store, 'text'))
+        self.for_each_store(test)
+
+    def test_directory_deleted(self):
+        def test(store):
+            shutil.rmtree(self.path('a'))
+            self.assertEqual(self.statuses(store), {'a': 'deleted-directory', 'a/f1.log': 'deleted',
+                                                    'a/f2.log': 'deleted'})
+        self.for_each_store(test)
+
+    def test_update_acknowledges_deletions(self):
+        def test(store):
+            os.remove(self.path('a/f2.log'))
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                checker.update_hash(self.root, store)
+            self.assertEqual(self.statuses(store), {})
+        self.for_each_store(test)
+
+    def test_digest_lists_direct_subdirectories_in_order(self):
+        outputs = []
+
+        def test(store):
+            self.write('c/d/f4.log', 'f4')
+            self.write('0/f5.log', 'f5')
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                checker.update_hash(self.root, store)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                checker.print_digests(self.root, store)
+            outputs.append([line.split('  ')[0] + ' ' + os.path.relpath(line.split('  ')[1], self.root)
+                            for line in output.getvalue().splitlines()])
+        self.for_each_store(test)
+        self.assertEqual([line.split()[1] for line in outputs[0]], ['.', '0', 'a', 'b', 'c'])
+        self.assertEqual(outputs[0], outputs[1])
+
+
+class TestDiagnostics(TestCase):
+
+    def test_errors_go_to_stderr(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            self.assertIsNone(checker.compute_hash('/nonexistent/file.log'))
+            self.assertEqual(checker.get_files('/nonexistent'), [])
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertIn('/nonexistent/file.log', stderr.getvalue())
+        self.assertIn('Path not found: /nonexistent', stderr.getvalue())
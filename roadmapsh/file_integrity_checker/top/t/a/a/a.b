@@ -0,0 +1 @@
+0.26452393870882807
\ No newline at end of file
@@ -0,0 +1 @@
+0.9937328811960112
\ No newline at end of file
@@ -0,0 +1 @@
+0.15359136185717792
\ No newline at end of file
@@ -0,0 +1 @@
+0.7400985055362133
\ No newline at end of file
@@ -0,0 +1 @@
+0.5436498023670203
\ No newline at end of file
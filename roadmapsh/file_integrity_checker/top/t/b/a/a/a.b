@@ -0,0 +1 @@
+0.17663221346389424
\ No newline at end of file
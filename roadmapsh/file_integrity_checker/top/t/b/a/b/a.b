@@ -0,0 +1 @@
+0.9411644821992249
\ No newline at end of file
@@ -0,0 +1 @@
+0.8494367864978515
\ No newline at end of file
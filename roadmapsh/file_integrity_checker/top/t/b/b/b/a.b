@@ -0,0 +1 @@
+0.38136981724135566
\ No newline at end of file